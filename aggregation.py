@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+import binning
+
+# Dimensions the dashboard filters or groups by
+DIMENSIONS = [
+    "gender",
+    "region",
+    "device_category",
+    "sleep_category",
+    "unlock_category",
+    "device_type",
+    "education_level",
+    "income_level",
+]
+
+# Numeric columns that get sum / count / sum-of-squares per group
+METRICS = [
+    "stress_level",
+    "anxiety_score",
+    "happiness_score",
+    "sleep_duration",
+    "focus_score",
+    "digital_dependence_score",
+    "productivity_score",
+    "device_hours_per_day",
+    "phone_unlocks",
+]
+
+
+def _stats_from_sums(total, count, sumsq):
+    """Build count / mean / std (ddof=1) from additive sums"""
+    count = count.astype("float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var = (sumsq - total * total / count) / (count - 1)
+    var = var.where(count > 1).clip(lower=0)
+    return pd.DataFrame({"count": count, "mean": mean, "std": np.sqrt(var)})
+
+
+class AggregateCube:
+    """
+    Pre-aggregated sum, count and sum-of-squares of every metric per
+    combination of DIMENSIONS. Charts and key metrics are computed by
+    reducing this table, so their cost depends on the number of groups
+    and not on the number of rows.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_frame(cls, df):
+        """Aggregate a row-level DataFrame into a cube"""
+        if any(name not in df.columns for name in binning.BUCKETS):
+            df = binning.add_bucket_columns(df)
+
+        dims = [d for d in DIMENSIONS if d in df.columns]
+        metrics = [m for m in METRICS if m in df.columns]
+        values = df[metrics].astype("float64")
+        parts = pd.concat(
+            [
+                values.add_suffix("_sum"),
+                (values * values).add_suffix("_sumsq"),
+                values.notna().astype("int64").add_suffix("_count"),
+            ],
+            axis=1,
+        )
+        parts["rows"] = 1
+        keys = [df[d] for d in dims]
+        table = parts.groupby(keys, observed=True, dropna=False, sort=False).sum()
+        return cls(table.reset_index())
+
+    def merge(self, other):
+        """Return a cube combining the groups of two cubes (sums are additive)"""
+        dims = [d for d in DIMENSIONS if d in self.table.columns]
+        combined = pd.concat([self.table, other.table], ignore_index=True)
+        table = combined.groupby(dims, observed=True, dropna=False, sort=False).sum()
+        return AggregateCube(table.reset_index())
+
+    def subtract(self, other):
+        """Return a cube without the rows aggregated in `other` (groups left without rows are dropped)"""
+        dims = [d for d in DIMENSIONS if d in self.table.columns]
+        negated = other.table.copy()
+        sums = [c for c in negated.columns if c not in dims]
+        negated[sums] = -negated[sums]
+        combined = pd.concat([self.table, negated], ignore_index=True)
+        table = combined.groupby(dims, observed=True, dropna=False, sort=False).sum()
+        return AggregateCube(table[table["rows"] > 0].reset_index())
+
+    @property
+    def row_count(self):
+        """Number of underlying rows"""
+        return int(self.table["rows"].sum())
+
+    def filter(self, **selections):
+        """
+        Return a cube restricted to the given dimension values,
+        e.g. cube.filter(gender="Male", region="Asia"). "All" or None means no filter.
+        """
+        mask = None
+        for dim, value in selections.items():
+            if value is None or value == "All":
+                continue
+            current = self.table[dim] == value
+            mask = current if mask is None else mask & current
+        if mask is None:
+            return self
+        return AggregateCube(self.table[mask])
+
+    def dimension_values(self, name):
+        """Distinct values of a dimension in order of first appearance"""
+        return list(self.table[name].dropna().unique())
+
+    def stats(self, by, metric):
+        """Count, mean and std of `metric` per value of dimension `by`"""
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        """{metric: count / mean / std per value of `by`} computed in one groupby"""
+        columns = [f"{m}_{part}" for m in metrics for part in ("sum", "count", "sumsq")]
+        grouped = self.table.groupby(by, observed=True)[columns].sum()
+        results = {}
+        for metric in metrics:
+            result = _stats_from_sums(
+                grouped[f"{metric}_sum"], grouped[f"{metric}_count"], grouped[f"{metric}_sumsq"]
+            )
+            result.index.name = by
+            results[metric] = result
+        return results
+
+    def totals(self):
+        """Overall count / mean / std of every metric"""
+        metrics = [m for m in METRICS if f"{m}_sum" in self.table.columns]
+        sums = self.table.sum(numeric_only=True)
+        return _stats_from_sums(
+            pd.Series({m: sums[f"{m}_sum"] for m in metrics}),
+            pd.Series({m: sums[f"{m}_count"] for m in metrics}),
+            pd.Series({m: sums[f"{m}_sumsq"] for m in metrics}),
+        )
+
+
+def group_stats(source, by, metric):
+    """
+    Count, mean and std of `metric` per value of `by`.
+    `source` can be a row-level DataFrame or any aggregate source with a
+    stats() method (AggregateCube, config.PostgresAggregates).
+    """
+    if not isinstance(source, pd.DataFrame):
+        return source.stats(by, metric)
+
+    keys = binning.bucket_series(source, by) if by in binning.BUCKETS else source[by]
+    result = source[metric].groupby(keys, observed=True).agg(["count", "mean", "std"])
+    result.index.name = by
+    return result
+
+
+def group_stats_many(source, by, metrics):
+    """
+    {metric: count / mean / std per value of `by`} for several metrics in one pass.
+    Sources without a stats_many() method get one stats() call per metric.
+    """
+    if isinstance(source, pd.DataFrame):
+        keys = binning.bucket_series(source, by) if by in binning.BUCKETS else source[by]
+        grouped = source[metrics].groupby(keys, observed=True).agg(["count", "mean", "std"])
+        results = {}
+        for metric in metrics:
+            result = grouped[metric]
+            result.index.name = by
+            results[metric] = result
+        return results
+    if hasattr(source, "stats_many"):
+        return source.stats_many(by, metrics)
+    return {metric: source.stats(by, metric) for metric in metrics}
+
+
+def total_stats(source):
+    """Overall count / mean / std of every metric for an aggregate source or a DataFrame"""
+    if not isinstance(source, pd.DataFrame):
+        return source.totals()
+
+    metrics = [m for m in METRICS if m in source.columns]
+    return source[metrics].agg(["count", "mean", "std"]).T
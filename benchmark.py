@@ -0,0 +1,315 @@
+"""
+Synthetic-data benchmark of the loading, preparation, filtering and charting pipeline.
+
+    python benchmark.py --sizes 10000 1000000 10000000
+    python benchmark.py --sizes 1000000 --skip-db --engines pandas duckdb
+    python benchmark.py --sessions 1 10 50 100 --session-rows 100000
+
+Every stage records wall time, peak traced memory and, for charts, the size of
+the serialized Plotly figure. With --sessions the dashboard itself is run for
+that many simulated browser sessions (Streamlit AppTest) and the traced memory
+is recorded as sessions are added. Results are written as JSON to BENCHMARK_DIR.
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import binning
+import boxstats
+import charts
+import duckdb_source
+import filter_index
+import planner
+import rawdata
+import sampling
+import schema
+import synthetic
+import trends
+
+BENCHMARK_DIR = os.getenv("BENCHMARK_DIR", os.path.join(".cache", "benchmarks"))
+
+# Rows drawn for the approximate-mode sample engine (same setting as the dashboard)
+SAMPLE_ROWS = int(os.getenv("APPROX_SAMPLE_ROWS", "200000"))
+
+# Filter selections timed for every size ("All" means no filter)
+FILTER_CASES = [
+    ("All", "All"),
+    ("Female", "All"),
+    ("All", "Asia"),
+    ("Male", "Europe"),
+]
+
+
+class Recorder:
+    """
+    Collects one result row per timed stage. Wall time is taken from an
+    untraced run; peak memory from a second run under tracemalloc, which
+    would otherwise inflate the timings (disabled with trace_memory=False).
+    Stages too slow to run twice (repeat=False) run once under tracemalloc;
+    their timing is flagged with "traced_timing".
+    """
+
+    def __init__(self, rows, trace_memory=True):
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.engine = "pandas"
+        self.results = []
+
+    def measure(self, stage, fn, repeat=True, **extra):
+        traced_once = self.trace_memory and not repeat
+        peak = None
+        if traced_once:
+            extra["traced_timing"] = True
+            tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            value = fn()
+            seconds = time.perf_counter() - start
+            if traced_once:
+                _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if traced_once:
+                tracemalloc.stop()
+
+        if self.trace_memory and repeat:
+            tracemalloc.start()
+            try:
+                fn()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        result = {
+            "rows": self.rows, "engine": self.engine, "stage": stage,
+            "seconds": round(seconds, 6), "peak_bytes": peak, **extra,
+        }
+        self.results.append(result)
+        memory = f"{peak / 1e6:>9.1f} MB" if peak is not None else ""
+        print(f"{self.rows:>10,}  {self.engine:<7} {stage:<55} {seconds * 1000:>10.1f} ms  {memory}")
+        return value
+
+
+def load_from_sqlite(rows, seed, workdir):
+    """Load the joined dataset through config.load_data with a SQLite file standing in for Postgres"""
+    import config as cfg
+
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f"synthetic_{rows}.sqlite")
+    if not os.path.exists(path):
+        synthetic.write_sqlite(path, rows, seed=seed)
+    cfg.DATABASE_URL = f"sqlite:///{path}"
+    cfg.dispose_engine()
+    return lambda: cfg.load_data(table_name="mental_health_data", prefer_postgres=True)
+
+
+def planned(source, page):
+    """PlannedSource for a page with its aggregations already executed"""
+    planned_source = planner.PlannedSource(source, charts.page_requirements(page))
+    planned_source._execute()
+    return planned_source
+
+
+def chart_payload(record, stage, plot_fn, source):
+    fig = record.measure(stage, lambda: plot_fn(source))
+    record.results[-1]["payload_bytes"] = len(fig.to_json())
+    return fig
+
+
+def aggregate_source(record, engine, df, cube):
+    """Aggregate source of the given engine for the prepared frame"""
+    if engine == "pandas":
+        return cube
+    if engine == "duckdb":
+        return record.measure("prepare.duckdb", lambda: duckdb_source.DuckDBSource.from_frame(df))
+    if engine == "sample":
+        return record.measure(
+            "prepare.sample", lambda: sampling.SampleCube.from_frame(df, SAMPLE_ROWS)
+        )
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def run_size(rows, seed=0, skip_db=False, workdir=None, trace_memory=True, engines=("pandas",)):
+    record = Recorder(rows, trace_memory)
+
+    if skip_db:
+        data = record.measure("generate", lambda: synthetic.generate_frame(rows, seed=seed), repeat=False)
+        data = data.drop(columns=["user_id"])
+    else:
+        data = record.measure("load", load_from_sqlite(rows, seed, workdir), repeat=False)
+    if data is None or len(data) == 0:
+        raise RuntimeError("Benchmark load returned no rows")
+
+    df, report = record.measure("prepare.normalize_dtypes", lambda: schema.normalize_dtypes(pd.DataFrame(data)))
+    # Loads through SQL are normalized batch by batch; their raw size is recorded by the loader
+    before = data.attrs.get("raw_bytes", report["before"])
+    record.results[-1].update({"frame_bytes_before": before, "frame_bytes_after": report["after"]})
+    del data
+    df = record.measure("prepare.bucket_columns", lambda: binning.add_bucket_columns(df, version=f"bench-{rows}"))
+    cube = record.measure("prepare.aggregate_cube", lambda: aggregation.AggregateCube.from_frame(df))
+    index = record.measure("prepare.filter_index", lambda: filter_index.FilterIndex.from_frame(df))
+    sketches = record.measure(
+        "prepare.box_sketches",
+        lambda: boxstats.SketchIndex.from_frame(df, by="income_level", metric="anxiety_score"),
+    )
+
+    daily = record.measure("prepare.daily_trends", lambda: trends.DailyAggregates.from_frame(df))
+    plot_trends = functools.partial(charts.plot_trend, metric="stress_level", window=30, split_by="region")
+
+    # Row-level stages do not depend on the aggregation engine and run once
+    for gender, region in FILTER_CASES:
+        label = f"{gender}/{region}"
+        view = record.measure(f"filter.rows[{label}]", lambda: index.view(df, gender=gender, region=region))
+        record.results[-1]["selected_rows"] = len(view)
+
+        rows_fn = lambda: view.frame(["income_level", "anxiety_score"])
+        box = sketches.view(rows=rows_fn, gender=gender, region=region)
+        chart_payload(record, f"chart.plot_income_vs_anxiety[{label}]", charts.plot_income_vs_anxiety, box)
+
+        if daily is not None:
+            chart_payload(record, f"chart.plot_trend[{label}]", plot_trends, daily.filter(gender=gender, region=region))
+
+        order = record.measure(f"rawdata.sort[{label}]", lambda: rawdata.sort_order(view, "stress_level", False))
+        record.measure(f"rawdata.page[{label}]", lambda: rawdata.page_frame(view, 0, 100, order=order))
+
+    for engine in engines:
+        record.engine = engine
+        source = aggregate_source(record, engine, df, cube)
+        for gender, region in FILTER_CASES:
+            label = f"{gender}/{region}"
+            filtered = record.measure(f"filter.aggregates[{label}]", lambda: source.filter(gender=gender, region=region))
+            record.results[-1]["selected_rows"] = filtered.row_count
+
+            built = set()
+            for page, plot_fns in charts.PAGE_CHARTS.items():
+                planned_source = record.measure(f"aggregate.page[{page}][{label}]", lambda: planned(filtered, page))
+                for plot_fn in plot_fns:
+                    if plot_fn.__name__ not in built:
+                        built.add(plot_fn.__name__)
+                        chart_payload(record, f"chart.{plot_fn.__name__}[{label}]", plot_fn, planned_source)
+
+    return record.results
+
+
+def run_sessions(counts, rows, seed=0, workdir=None):
+    """
+    Render the dashboard for up to max(counts) concurrent sessions against one
+    SQLite-backed dataset, keeping every session alive, and record the traced
+    memory when each count is reached. Sessions share the process-wide dataset,
+    so memory per extra session should stay flat.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    os.environ.setdefault("SNAPSHOT_PATH", os.path.join(workdir, "snapshot.arrow"))
+    from streamlit.testing.v1 import AppTest
+
+    load_from_sqlite(rows, seed, workdir)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    genders = ["All", "Male", "Female"]
+    regions = ["All", *synthetic.REGIONS]
+
+    results = []
+    sessions = []
+    tracemalloc.start()
+    try:
+        for n in range(1, max(counts) + 1):
+            app = AppTest.from_file(script, default_timeout=300).run()
+            if app.exception:
+                raise RuntimeError(f"Session {n} failed: {app.exception}")
+            # Every session picks its own filters
+            app.selectbox[0].set_value(genders[n % len(genders)])
+            app.selectbox[1].set_value(regions[n % len(regions)])
+            app.run()
+            sessions.append(app)
+            if n == 1 or n in counts:
+                gc.collect()
+                current, peak = tracemalloc.get_traced_memory()
+                results.append({"rows": rows, "stage": "sessions", "sessions": n, "traced_bytes": current, "peak_bytes": peak})
+    finally:
+        tracemalloc.stop()
+
+    base = results[0]["traced_bytes"]
+    for result in results:
+        extra = result["sessions"] - 1
+        result["bytes_per_extra_session"] = (result["traced_bytes"] - base) / extra if extra else 0.0
+        print(
+            f"{rows:>10,}  sessions={result['sessions']:<5} {result['traced_bytes'] / 1e6:>9.1f} MB traced  "
+            f"{result['bytes_per_extra_session'] / 1e3:>8.1f} KB per extra session"
+        )
+    return [r for r in results if r["sessions"] in counts]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results, args):
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(BENCHMARK_DIR, f"benchmark-{stamp}.json")
+    payload = {
+        "created_at": stamp,
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sizes": args.sizes,
+        "sessions": args.sessions,
+        "seed": args.seed,
+        "source": "generated" if args.skip_db else "sqlite",
+        "engines": args.engines,
+        "memory_traced": not args.no_memory,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, default=float)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-db", action="store_true", help="generate the joined frame in memory instead of loading it through SQL")
+    parser.add_argument(
+        "--engines", nargs="+", default=["pandas"], choices=["pandas", "duckdb", "sample"],
+        help="aggregation engines to compare (pandas cube, DuckDB over the rows, approximate-mode sample)",
+    )
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of every stage")
+    parser.add_argument("--sessions", type=int, nargs="+", help="run the per-session memory benchmark for these session counts")
+    parser.add_argument("--session-rows", type=int, default=100_000, help="dataset size for --sessions")
+    parser.add_argument("--workdir", default=None, help="where the SQLite files are kept (default: a temporary directory)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as tmp:
+        workdir = args.workdir or tmp
+        if args.sessions:
+            results.extend(run_sessions(sorted(args.sessions), args.session_rows, seed=args.seed, workdir=workdir))
+        for rows in [] if args.sessions else args.sizes:
+            results.extend(run_size(
+                rows, seed=args.seed, skip_db=args.skip_db, workdir=workdir,
+                trace_memory=not args.no_memory, engines=args.engines,
+            ))
+
+    path = save_results(results, args)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
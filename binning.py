@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# Bucket definitions used by the charts. Each entry maps the derived column
+# name to the source column, the bin edges, whether each edge belongs to the
+# lower bucket (True -> "x <= edge", False -> "x < edge") and the labels in
+# display order.
+BUCKETS = {
+    "device_category": {
+        "source": "device_hours_per_day",
+        "edges": (2, 5, 8),
+        "lower_inclusive": (True, True, True),
+        "labels": ("0-2 hours", "3-5 hours", "6-8 hours", ">8 hours"),
+    },
+    "sleep_category": {
+        "source": "sleep_duration",
+        "edges": (6, 7, 8),
+        "lower_inclusive": (False, True, True),
+        "labels": ("<6 hours", "6-7 hours", "7-8 hours", ">8 hours"),
+    },
+    "unlock_category": {
+        "source": "phone_unlocks",
+        "edges": (20, 50, 80),
+        "lower_inclusive": (True, True, True),
+        "labels": ("0-20", "21-50", "51-80", ">80"),
+    },
+}
+
+# Categorical codes per (dataset version, bucket column). Only the most recent
+# versions are kept so old datasets do not pile up in memory.
+_code_cache = {}
+_MAX_CACHED_VERSIONS = 2
+
+
+def bucket_order(name):
+    """Return the display order of the labels for a bucket column"""
+    return list(BUCKETS[name]["labels"])
+
+
+def bucket_codes(values, name):
+    """
+    Compute the bucket code of every value in one vectorized pass.
+    Missing values get code -1.
+    """
+    spec = BUCKETS[name]
+    values = np.asarray(values, dtype="float64")
+    codes = np.zeros(len(values), dtype="int8")
+    for edge, inclusive in zip(spec["edges"], spec["lower_inclusive"]):
+        if inclusive:
+            codes += values > edge
+        else:
+            codes += values >= edge
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def _cached_codes(df, name, version):
+    if version is None:
+        return bucket_codes(df[BUCKETS[name]["source"]], name)
+
+    key = (version, name)
+    codes = _code_cache.get(key)
+    if codes is None or len(codes) != len(df):
+        codes = bucket_codes(df[BUCKETS[name]["source"]], name)
+        versions = {v for v, _ in _code_cache}
+        if version not in versions and len(versions) >= _MAX_CACHED_VERSIONS:
+            oldest = next(iter(_code_cache))[0]
+            for k in [k for k in _code_cache if k[0] == oldest]:
+                del _code_cache[k]
+        _code_cache[key] = codes
+    return codes
+
+
+def add_bucket_columns(df, version=None):
+    """
+    Add every bucket column defined in BUCKETS to `df` as an ordered categorical.
+    Codes are cached per dataset version when `version` is given.
+    """
+    columns = {}
+    for name, spec in BUCKETS.items():
+        if spec["source"] not in df.columns:
+            continue
+        codes = _cached_codes(df, name, version)
+        columns[name] = pd.Categorical.from_codes(
+            codes, categories=list(spec["labels"]), ordered=True
+        )
+    return df.assign(**columns)
+
+
+def bucket_series(df, name):
+    """Return the bucket column from `df`, computing it if it is missing"""
+    if name in df.columns:
+        return df[name]
+    spec = BUCKETS[name]
+    codes = bucket_codes(df[spec["source"]], name)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=list(spec["labels"]), ordered=True),
+        index=df.index,
+        name=name,
+    )
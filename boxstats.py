@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+# Groups up to this size get exact quartiles; larger groups use t-digest sketches
+EXACT_LIMIT = 200_000
+
+# Values are fed to a digest in chunks of this size
+CHUNK_SIZE = 1_000_000
+
+
+class TDigest:
+    """
+    Small vectorized t-digest (Dunning's merging variant with the k1 scale
+    function). Digests are mergeable, so per-segment digests can be combined
+    into the digest of any filter selection without touching the rows.
+    """
+
+    def __init__(self, means=None, weights=None, minimum=np.inf, maximum=-np.inf, compression=200):
+        self.means = np.empty(0) if means is None else means
+        self.weights = np.empty(0) if weights is None else weights
+        self.min = minimum
+        self.max = maximum
+        self.compression = compression
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    @classmethod
+    def from_values(cls, values, compression=200):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        digest = cls(compression=compression)
+        for start in range(0, len(values), CHUNK_SIZE):
+            chunk = values[start:start + CHUNK_SIZE]
+            chunk_digest = cls(chunk, np.ones(len(chunk)), chunk.min(), chunk.max(), compression)
+            digest = digest.merge(chunk_digest)
+        return digest
+
+    def merge(self, *others):
+        """Return a digest of the union of this digest and `others`"""
+        digests = [self, *others]
+        means = np.concatenate([d.means for d in digests])
+        weights = np.concatenate([d.weights for d in digests])
+        minimum = min(d.min for d in digests)
+        maximum = max(d.max for d in digests)
+        if len(means) == 0:
+            return TDigest(compression=self.compression)
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        # k1 scale: centroids whose left edge falls in the same unit of k are merged
+        left_q = (np.cumsum(weights) - weights) / weights.sum()
+        k = self.compression * (np.arcsin(2 * left_q - 1) / np.pi + 0.5)
+        buckets = np.floor(k).astype(np.int64)
+        _, buckets = np.unique(buckets, return_inverse=True)
+        merged_weights = np.bincount(buckets, weights=weights)
+        merged_means = np.bincount(buckets, weights=means * weights) / merged_weights
+        return TDigest(merged_means, merged_weights, minimum, maximum, self.compression)
+
+    def quantile(self, q):
+        """Approximate quantile(s) by interpolating between centroid centers"""
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan)
+        centers = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        positions = np.concatenate([[0.0], centers, [1.0]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q, positions, values)
+
+
+def _box_from_quartiles(q1, median, q3, minimum, maximum, mean, sd, count, approximate):
+    iqr = q3 - q1
+    return {
+        "count": count,
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": max(minimum, q1 - 1.5 * iqr),
+        "upperfence": min(maximum, q3 + 1.5 * iqr),
+        "mean": mean,
+        "sd": sd,
+        "approximate": approximate,
+    }
+
+
+def exact_box_stats(values):
+    """Quartiles, whiskers, mean and SD of a group using NumPy partitioning"""
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    # Whiskers end at the most extreme data points within 1.5 IQR (as Plotly does)
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    stats = _box_from_quartiles(
+        q1, median, q3, values.min(), values.max(), values.mean(),
+        values.std(ddof=1) if len(values) > 1 else np.nan, len(values), False,
+    )
+    stats["lowerfence"], stats["upperfence"] = inside.min(), inside.max()
+    return stats
+
+
+def digest_box_stats(digest, total, sumsq):
+    """Approximate box statistics from a digest plus the exact sum / sum-of-squares"""
+    count = digest.count
+    if count == 0:
+        return None
+    q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+    mean = total / count
+    sd = np.sqrt(max((sumsq - total * total / count) / (count - 1), 0)) if count > 1 else np.nan
+    return _box_from_quartiles(q1, median, q3, digest.min, digest.max, mean, sd, int(count), True)
+
+
+def values_box_stats(values):
+    """Exact stats for small groups, t-digest stats for large ones"""
+    values = np.asarray(values, dtype="float64")
+    if len(values) <= EXACT_LIMIT:
+        return exact_box_stats(values)
+    values = values[~np.isnan(values)]
+    return digest_box_stats(TDigest.from_values(values), values.sum(), np.dot(values, values))
+
+
+def _to_frame(stats_by_group, by):
+    rows = {group: stats for group, stats in stats_by_group.items() if stats is not None}
+    result = pd.DataFrame.from_dict(rows, orient="index")
+    result.index.name = by
+    return result
+
+
+def group_box_stats(source, by, metric):
+    """
+    Box statistics of `metric` per value of `by` (one row per group).
+    `source` can be a row-level DataFrame or an object with a box_stats() method (SketchIndex view).
+    """
+    if not isinstance(source, pd.DataFrame):
+        return source.box_stats(by, metric)
+    stats = {}
+    for group, values in source[metric].groupby(source[by], observed=True):
+        stats[group] = values_box_stats(values.to_numpy())
+    return _to_frame(stats, by)
+
+
+class SketchIndex:
+    """
+    One t-digest (plus count / sum / sum-of-squares) of `metric` per
+    combination of segment dimensions and `by`, built once per dataset version.
+    """
+
+    def __init__(self, table, by, metric, segment_dims):
+        self.table = table  # DataFrame: segment dims, by, digest, count, total, sumsq
+        self.by = by
+        self.metric = metric
+        self.segment_dims = segment_dims
+
+    @classmethod
+    def from_frame(cls, df, by="income_level", metric="anxiety_score", segment_dims=("gender", "region")):
+        keys = [df[d] for d in (*segment_dims, by)]
+        records = []
+        for key, values in df[metric].groupby(keys, observed=True):
+            values = values.to_numpy(dtype="float64")
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            records.append((*key, TDigest.from_values(values), len(values), values.sum(), np.dot(values, values)))
+        table = pd.DataFrame.from_records(records, columns=[*segment_dims, by, "digest", "count", "total", "sumsq"])
+        return cls(table, by, metric, list(segment_dims))
+
+    def view(self, rows=None, **selections):
+        """
+        Box statistics source for a filter selection. `rows` is a callable
+        returning the selected rows, used for groups small enough for exact stats.
+        """
+        return SketchView(self, rows, selections)
+
+
+class SketchView:
+    """Filter selection of a SketchIndex; see SketchIndex.view()"""
+
+    def __init__(self, index, rows, selections):
+        self.index = index
+        self.rows = rows
+        self.selections = selections
+
+    def box_stats(self, by, metric):
+        index = self.index
+        if by != index.by or metric != index.metric:
+            raise ValueError(f"SketchIndex was built for ({index.by}, {index.metric})")
+
+        table = index.table
+        for dim, value in self.selections.items():
+            if value is not None and value != "All":
+                table = table[table[dim] == value]
+
+        rows = None
+        stats = {}
+        for group, segments in table.groupby(by, observed=True):
+            if segments["count"].sum() <= EXACT_LIMIT and self.rows is not None:
+                if rows is None:
+                    rows = self.rows()
+                stats[group] = exact_box_stats(rows[metric].to_numpy()[rows[by].to_numpy() == group])
+            else:
+                digests = list(segments["digest"])
+                digest = digests[0].merge(*digests[1:])
+                stats[group] = digest_box_stats(digest, segments["total"].sum(), segments["sumsq"].sum())
+        return _to_frame(stats, by)
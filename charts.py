@@ -0,0 +1,374 @@
+import numpy as np
+import plotly.graph_objects as go
+
+import aggregation
+import binning
+import boxstats
+import sampling
+import trends
+
+# ========== VISUALIZATION FUNCTIONS ==========
+
+def common_layout_updates(fig, title):
+    """Apply consistent modern styling to all charts"""
+    fig.update_layout(
+        title={'text': f'<b>{title}</b>', 'font': {'size': 18, 'color': '#2d3748', 'family': 'Inter'}},
+        template='plotly_white',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='#2d3748', size=12),
+        margin=dict(l=20, r=20, t=50, b=50),  # Increased bottom margin
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        xaxis=dict(fixedrange=True),  # Disable zoom/pan on X
+        yaxis=dict(fixedrange=True),  # Disable zoom/pan on Y
+        dragmode=False  # Disable drag interactions entirely
+    )
+    return fig
+
+def confidence_bars(stats):
+    """Error bars of the 95% confidence intervals of approximate stats (None for exact stats)"""
+    if not sampling.is_approximate(stats):
+        return None
+    return dict(
+        type='data', symmetric=False,
+        array=(stats['ci_high'] - stats['mean']).values,
+        arrayminus=(stats['mean'] - stats['ci_low']).values,
+        color='#4a5568', thickness=1.5, width=4
+    )
+
+def mark_approximate(fig, stats):
+    """Flag a figure drawn from approximate stats (read by is_approximate)"""
+    if sampling.is_approximate(stats):
+        fig.update_layout(meta={'approximate': True})
+    return fig
+
+def is_approximate(fig):
+    """True for figures drawn from sampled statistics"""
+    meta = fig.layout.meta
+    return isinstance(meta, dict) and bool(meta.get('approximate'))
+
+def plot_device_usage_vs_stress(source):
+    """1. Device Usage vs Stress Level - Line Chart"""
+    # Calculate average stress per category
+    category_order = binning.bucket_order('device_category')
+    stats = aggregation.group_stats(source, 'device_category', 'stress_level').reindex(category_order)
+    grouped = stats['mean']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=grouped.index,
+        y=grouped.values,
+        error_y=confidence_bars(stats),
+        mode='lines+markers',
+        name='Avg Stress Level',
+        line=dict(color='#667eea', width=4, shape='spline'),
+        marker=dict(size=10, color='#667eea', line=dict(color='white', width=2)),
+        fill='tozeroy',
+        fillcolor='rgba(102, 126, 234, 0.1)'
+    ))
+    
+    fig = common_layout_updates(fig, 'Device Usage vs Stress Level')
+    fig.update_layout(height=350)
+    return mark_approximate(fig, stats)
+
+def plot_sleep_vs_anxiety(source):
+    """2. Sleep Duration vs Anxiety Score - Column Bar Chart"""
+    category_order = binning.bucket_order('sleep_category')
+    stats = aggregation.group_stats(source, 'sleep_category', 'anxiety_score').reindex(category_order)
+    grouped = stats['mean']
+    
+    colors = ['#ff6b9d', '#ffa500', '#6bcb77', '#4d96ff']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=grouped.index,
+        y=grouped.values,
+        error_y=confidence_bars(stats),
+        marker=dict(color=colors, line=dict(color='white', width=2)),
+        text=grouped.values.round(2),
+        textposition='auto',
+    ))
+    
+    fig = common_layout_updates(fig, 'Sleep Duration vs Anxiety')
+    fig.update_layout(height=350)
+    return mark_approximate(fig, stats)
+
+def plot_device_type_vs_productivity(source):
+    """3. Device Type vs Productivity Score - Horizontal Bar Chart"""
+    stats = aggregation.group_stats(source, 'device_type', 'productivity_score').sort_values('mean')
+    grouped = stats['mean']
+    
+    colors = ['#c780fa', '#ff6b9d', '#ffa500', '#6bcb77']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=grouped.index,
+        x=grouped.values,
+        error_x=confidence_bars(stats),
+        orientation='h',
+        marker=dict(color=colors[:len(grouped)], line=dict(color='white', width=2)),
+        text=grouped.values.round(2),
+        textposition='auto',
+    ))
+    
+    fig = common_layout_updates(fig, 'Device Type vs Productivity')
+    fig.update_layout(height=350)
+    return mark_approximate(fig, stats)
+
+def plot_region_vs_happiness(source):
+    """4. Region vs Happiness Score - Pie Chart"""
+    stats = aggregation.group_stats(source, 'region', 'happiness_score')
+    grouped = stats['mean']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Pie(
+        labels=grouped.index,
+        values=grouped.values,
+        hole=0.5,
+        marker=dict(colors=['#667eea', '#764ba2', '#ff6b9d', '#ffa500', '#6bcb77', '#4d96ff'], 
+                   line=dict(color='white', width=2)),
+        textinfo='percent',
+        hoverinfo='label+value'
+    ))
+    
+    # Specific layout for Pie chart to handle legend overlap
+    fig.update_layout(
+        title={'text': '<b>Happiness by Region</b>', 'font': {'size': 18, 'color': '#2d3748', 'family': 'Inter'}},
+        template='plotly_white',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', color='#2d3748', size=12),
+        margin=dict(l=10, r=10, t=60, b=150),  # Ample bottom margin for 3 rows
+        height=600,
+        legend=dict(
+            orientation="h", 
+            yanchor="top", 
+            y=-0.1, 
+            xanchor="center", 
+            x=0.5,
+            entrywidth=0.45,  # Force 2 columns (45% width each)
+            entrywidthmode='fraction',
+            font=dict(size=11)
+        ),
+        dragmode=False
+    )
+    # Update trace to add padding around the circle itself
+    fig.update_traces(domain=dict(x=[0.1, 0.9], y=[0.1, 0.9])) 
+    if sampling.is_approximate(stats):
+        # Pie slices cannot show error bars; the intervals go into the hover text
+        fig.update_traces(
+            customdata=stats[['ci_low', 'ci_high']].values,
+            hovertemplate='%{label}: %{value:.2f} (95% CI %{customdata[0]:.2f}–%{customdata[1]:.2f})<extra></extra>'
+        )
+    return mark_approximate(fig, stats)
+
+def plot_education_vs_dependence(source):
+    """5. Education Level vs Digital Dependence Score - Radar Chart"""
+    education_order = ['High School', 'Bachelor', 'Master', 'PhD']
+    stats = aggregation.group_stats(source, 'education_level', 'digital_dependence_score').reindex(education_order)
+    grouped = stats['mean']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=grouped.values,
+        theta=grouped.index,
+        fill='toself',
+        name='Digital Dependence',
+        line=dict(color='#764ba2', width=3),
+        fillcolor='rgba(118, 75, 162, 0.3)',
+        marker=dict(size=8, color='#764ba2')
+    ))
+    
+    fig = common_layout_updates(fig, 'Education vs Digital Dependence')
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, grouped.max() * 1.2]),
+            bgcolor='rgba(0,0,0,0)'
+        ),
+        height=400
+    )
+    return mark_approximate(fig, stats)
+
+def plot_gender_vs_stress(source):
+    """6. Gender vs Stress Level - Clustered Bar Chart"""
+    stats = aggregation.group_stats(source, 'gender', 'stress_level')
+    grouped = stats[['mean', 'std']].reset_index()
+    
+    colors_map = {'Male': '#4d96ff', 'Female': '#ff6b9d', 'Non-binary': '#6bcb77'}
+    colors = [colors_map.get(g, '#ffa500') for g in grouped['gender']]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=grouped['gender'],
+        y=grouped['mean'],
+        error_y=confidence_bars(stats),
+        name='Average Stress',
+        marker=dict(color=colors, line=dict(color='white', width=2)),
+        text=grouped['mean'].round(2),
+        textposition='auto',
+    ))
+    
+    fig = common_layout_updates(fig, 'Gender vs Stress Level')
+    fig.update_layout(height=350)
+    return mark_approximate(fig, stats)
+
+def plot_phone_unlocks_vs_focus(source):
+    """7. Phone Unlocks vs Focus Score - Line Chart"""
+    category_order = binning.bucket_order('unlock_category')
+    stats = aggregation.group_stats(source, 'unlock_category', 'focus_score').reindex(category_order)
+    grouped = stats['mean']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=grouped.index,
+        y=grouped.values,
+        error_y=confidence_bars(stats),
+        mode='lines+markers',
+        name='Avg Focus',
+        line=dict(color='#ffa500', width=4, shape='spline'),
+        marker=dict(size=10, color='#ffa500', line=dict(color='white', width=2)),
+        fill='tozeroy',
+        fillcolor='rgba(255, 165, 0, 0.1)'
+    ))
+    
+    fig = common_layout_updates(fig, 'Phone Unlocks vs Focus')
+    fig.update_layout(height=350)
+    return mark_approximate(fig, stats)
+
+def plot_income_vs_anxiety(source):
+    """8. Income Level vs Anxiety Score - Box Plot (precomputed box statistics)"""
+    income_order = ['Low', 'Lower-Mid', 'Upper-Mid', 'High']
+    colors = {'Low': '#ff6b9d', 'Lower-Mid': '#ffa500', 'Upper-Mid': '#6bcb77', 'High': '#4d96ff'}
+    stats = boxstats.group_box_stats(source, 'income_level', 'anxiety_score')
+    
+    fig = go.Figure()
+    
+    for income in income_order:
+        if income not in stats.index:
+            continue
+        box = stats.loc[income]
+        fig.add_trace(go.Box(
+            x=[income],
+            q1=[box['q1']],
+            median=[box['median']],
+            q3=[box['q3']],
+            lowerfence=[box['lowerfence']],
+            upperfence=[box['upperfence']],
+            mean=[box['mean']],
+            sd=[box['sd']],
+            name=income,
+            marker=dict(color=colors.get(income, '#999999')),
+            boxmean='sd',
+            boxpoints=False
+        ))
+    
+    fig = common_layout_updates(fig, 'Income vs Anxiety Distribution')
+    fig.update_layout(height=350, showlegend=False)
+    return mark_approximate(fig, stats)
+
+TREND_TITLES = {
+    'stress_level': 'Stress Level',
+    'anxiety_score': 'Anxiety Score',
+    'happiness_score': 'Happiness Score',
+    'device_hours_per_day': 'Device Hours per Day',
+}
+
+TREND_COLORS = ['#667eea', '#ff6b9d', '#6bcb77', '#ffa500', '#4d96ff', '#764ba2']
+
+def plot_trend(source, metric, resolution='Daily', window=1, split_by=None):
+    """9. Metric over Time per Segment - WebGL Line Chart (downsampled on the server)"""
+    frame = trends.trend_frame(source, metric, resolution, window, split_by)
+    
+    fig = go.Figure()
+    for i, column in enumerate(frame.columns):
+        series = frame[column].dropna()
+        fig.add_trace(go.Scattergl(
+            x=series.index,
+            y=series.values,
+            mode='lines',
+            name=str(column),
+            line=dict(color=TREND_COLORS[i % len(TREND_COLORS)], width=2)
+        ))
+    
+    title = f"{resolution} {TREND_TITLES.get(metric, metric)}"
+    if window > 1:
+        title += f" ({window}-{'day' if resolution == 'Daily' else 'week'} rolling mean)"
+    fig = common_layout_updates(fig, title)
+    # Zooming along the time axis stays enabled
+    fig.update_layout(height=350, dragmode='zoom', hovermode='x unified', showlegend=split_by is not None)
+    fig.update_xaxes(fixedrange=False)
+    return fig
+
+CORRELATION_LABELS = {
+    'stress_level': 'Stress',
+    'anxiety_score': 'Anxiety',
+    'happiness_score': 'Happiness',
+    'sleep_duration': 'Sleep',
+    'focus_score': 'Focus',
+    'digital_dependence_score': 'Dependence',
+    'productivity_score': 'Productivity',
+    'device_hours_per_day': 'Device Hours',
+    'phone_unlocks': 'Unlocks',
+}
+
+def significance_stars(p):
+    """*** p < 0.001, ** p < 0.01, * p < 0.05"""
+    if not np.isfinite(p):
+        return ''
+    return '***' if p < 0.001 else '**' if p < 0.01 else '*' if p < 0.05 else ''
+
+def plot_correlation_matrix(results, segment):
+    """10. Correlation Matrix of one Segment - Heatmap (r with significance stars)"""
+    result = results[segment]
+    r, p = result['r'], result['p']
+    labels = [CORRELATION_LABELS.get(c, c) for c in r.columns]
+    text = [
+        [f"{r.iat[i, j]:.2f}{significance_stars(p.iat[i, j])}" if np.isfinite(r.iat[i, j]) else ''
+         for j in range(r.shape[1])]
+        for i in range(r.shape[0])
+    ]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(
+        z=r.values,
+        x=labels,
+        y=labels,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu_r',
+        text=text,
+        texttemplate='%{text}',
+        textfont=dict(size=10),
+        customdata=p.values,
+        hovertemplate='%{y} ~ %{x}<br>r = %{z:.3f}<br>p = %{customdata:.2g}<extra></extra>',
+        colorbar=dict(thickness=12)
+    ))
+    
+    fig = common_layout_updates(fig, f"{segment} (n = {result['n']:,})")
+    fig.update_layout(height=450)
+    fig.update_yaxes(autorange='reversed')
+    return fig
+
+# (group-by, metric) pairs each chart reads from its aggregate source
+CHART_STATS = {
+    plot_device_usage_vs_stress: [('device_category', 'stress_level')],
+    plot_sleep_vs_anxiety: [('sleep_category', 'anxiety_score')],
+    plot_device_type_vs_productivity: [('device_type', 'productivity_score')],
+    plot_region_vs_happiness: [('region', 'happiness_score')],
+    plot_education_vs_dependence: [('education_level', 'digital_dependence_score')],
+    plot_gender_vs_stress: [('gender', 'stress_level')],
+    plot_phone_unlocks_vs_focus: [('unlock_category', 'focus_score')],
+}
+
+# Aggregate-backed charts shown on each page
+PAGE_CHARTS = {
+    "Dashboard": [plot_device_usage_vs_stress, plot_region_vs_happiness, plot_sleep_vs_anxiety, plot_gender_vs_stress],
+    "Device Usage": [plot_device_usage_vs_stress, plot_device_type_vs_productivity],
+    "Sleep & Mental Health": [plot_sleep_vs_anxiety],
+    "Demographics": [plot_region_vs_happiness, plot_gender_vs_stress, plot_education_vs_dependence],
+    "Behavioral Patterns": [plot_phone_unlocks_vs_focus],
+}
+
+def page_requirements(page):
+    """All (group-by, metric) pairs needed by the charts of a page"""
+    return [pair for plot_fn in PAGE_CHARTS.get(page, []) for pair in CHART_STATS[plot_fn]]
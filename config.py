@@ -1,7 +1,15 @@
+import atexit
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import pandas as pd
 
+import binning
+import schema
+from aggregation import METRICS
+
 # Load environment variables
 load_dotenv()
 
@@ -11,10 +19,68 @@ try:
     SUPABASE_URL = st.secrets.get("EXPO_PUBLIC_SUPABASE_URL", os.getenv("EXPO_PUBLIC_SUPABASE_URL"))
     SUPABASE_KEY = st.secrets.get("EXPO_PUBLIC_SUPABASE_ANON_KEY", os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY"))
     DATABASE_URL = st.secrets.get("DATABASE_URL", os.getenv("DATABASE_URL"))
+    QUERY_MODE = st.secrets.get("QUERY_MODE", os.getenv("QUERY_MODE", "rows"))
+    DB_POOL_SIZE = int(st.secrets.get("DB_POOL_SIZE", os.getenv("DB_POOL_SIZE", "5")))
+    DB_MAX_OVERFLOW = int(st.secrets.get("DB_MAX_OVERFLOW", os.getenv("DB_MAX_OVERFLOW", "10")))
+    DB_POOL_TIMEOUT = float(st.secrets.get("DB_POOL_TIMEOUT", os.getenv("DB_POOL_TIMEOUT", "30")))
+    DB_POOL_RECYCLE = int(st.secrets.get("DB_POOL_RECYCLE", os.getenv("DB_POOL_RECYCLE", "1800")))
+    SUPABASE_PAGE_SIZE = int(st.secrets.get("SUPABASE_PAGE_SIZE", os.getenv("SUPABASE_PAGE_SIZE", "1000")))
+    SUPABASE_MAX_WORKERS = int(st.secrets.get("SUPABASE_MAX_WORKERS", os.getenv("SUPABASE_MAX_WORKERS", "8")))
+    SUPABASE_PAGE_RETRIES = int(st.secrets.get("SUPABASE_PAGE_RETRIES", os.getenv("SUPABASE_PAGE_RETRIES", "3")))
+    SUPABASE_ORDER_BY = st.secrets.get("SUPABASE_ORDER_BY", os.getenv("SUPABASE_ORDER_BY", "id"))
+    ANALYTICS_SERVICE_URL = st.secrets.get("ANALYTICS_SERVICE_URL", os.getenv("ANALYTICS_SERVICE_URL", ""))
+    LOAD_CHUNK_ROWS = int(st.secrets.get("LOAD_CHUNK_ROWS", os.getenv("LOAD_CHUNK_ROWS", "50000")))
+    AGG_ENGINE = st.secrets.get("AGG_ENGINE", os.getenv("AGG_ENGINE", "pandas"))
+    DUCKDB_THREADS = int(st.secrets.get("DUCKDB_THREADS", os.getenv("DUCKDB_THREADS", "0")))
+    APPROX_ROWS = int(st.secrets.get("APPROX_ROWS", os.getenv("APPROX_ROWS", "0")))
+    APPROX_SAMPLE_ROWS = int(st.secrets.get("APPROX_SAMPLE_ROWS", os.getenv("APPROX_SAMPLE_ROWS", "200000")))
 except:
     SUPABASE_URL = os.getenv("EXPO_PUBLIC_SUPABASE_URL")
     SUPABASE_KEY = os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY")
     DATABASE_URL = os.getenv("DATABASE_URL")
+    QUERY_MODE = os.getenv("QUERY_MODE", "rows")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    SUPABASE_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+    SUPABASE_MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "8"))
+    SUPABASE_PAGE_RETRIES = int(os.getenv("SUPABASE_PAGE_RETRIES", "3"))
+    SUPABASE_ORDER_BY = os.getenv("SUPABASE_ORDER_BY", "id")
+    ANALYTICS_SERVICE_URL = os.getenv("ANALYTICS_SERVICE_URL", "")
+    LOAD_CHUNK_ROWS = int(os.getenv("LOAD_CHUNK_ROWS", "50000"))
+    AGG_ENGINE = os.getenv("AGG_ENGINE", "pandas")
+    DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0"))
+    APPROX_ROWS = int(os.getenv("APPROX_ROWS", "0"))
+    APPROX_SAMPLE_ROWS = int(os.getenv("APPROX_SAMPLE_ROWS", "200000"))
+
+# Source expression of every column the dashboard uses, relative to JOIN_SQL
+COLUMN_SQL = {
+    "stress_level": "wa.stress_level",
+    "anxiety_score": "wa.anxiety_score",
+    "happiness_score": "wa.happiness_score",
+    "sleep_duration": "wa.sleep_duration",
+    "focus_score": "wa.focus_score",
+    "gender": "u.gender",
+    "education_level": "u.education_level",
+    "income_level": "u.income_level",
+    "region": "r.region_name",
+    "digital_dependence_score": "dls.digital_dependence_score",
+    "productivity_score": "dls.productivity_score",
+    "device_hours_per_day": "al.hours_used",
+    "phone_unlocks": "al.phone_unlocks",
+    "device_type": "d.device_type",
+    "date": "wa.date",
+}
+
+JOIN_SQL = """
+            FROM users u
+            JOIN wellness_assessments wa ON u.user_id = wa.user_id
+            JOIN digital_lifestyle_scores dls ON wa.assessment_id = dls.assessment_id
+            JOIN activity_logs al ON u.user_id = al.user_id AND wa.date = al.date
+            JOIN devices d ON al.device_id = d.device_id
+            JOIN regions r ON u.region_id = r.region_id
+"""
 
 # Lazy import supabase to avoid errors if not installed
 supabase_client = None
@@ -38,24 +104,81 @@ def get_supabase_client():
         raise ImportError("supabase package not installed")
 
 
+def _fetch_supabase_page(table_name, start, end, count=False):
+    """Fetch rows [start, end] of a table, retrying with backoff on failure"""
+    supabase = get_supabase_client()
+    for attempt in range(SUPABASE_PAGE_RETRIES + 1):
+        try:
+            query = supabase.table(table_name).select("*", count="exact" if count else None)
+            if SUPABASE_ORDER_BY:
+                query = query.order(SUPABASE_ORDER_BY)
+            return query.range(start, end).execute()
+        except Exception as e:
+            if attempt == SUPABASE_PAGE_RETRIES:
+                raise
+            print(f"Retrying Supabase page {start}-{end} after error: {e}")
+            time.sleep(0.5 * 2 ** attempt)
+
+
 def load_data_from_supabase(table_name: str = "mental_health_data"):
     """
     Load data from Supabase table using the Supabase client.
-    Returns a list of dictionaries (or None on error).
+    The first page also returns the exact row count; the remaining pages are
+    fetched concurrently (SUPABASE_MAX_WORKERS threads) and converted to
+    DataFrames as they arrive, so tables larger than the server row limit are
+    loaded completely. Offset pages are only disjoint when every page is
+    ordered by a unique key (SUPABASE_ORDER_BY); without one the pages are
+    fetched one at a time. Returns a DataFrame (or None on error, including
+    a row count that does not match the table's).
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.table(table_name).select("*").execute()
-        return response.data
+        page_size = SUPABASE_PAGE_SIZE
+        first = _fetch_supabase_page(table_name, 0, page_size - 1, count=True)
+        pages = {0: pd.DataFrame(first.data)}
+        total = first.count if first.count is not None else len(first.data)
+
+        starts = range(page_size, total, page_size)
+        workers = SUPABASE_MAX_WORKERS
+        if starts and not SUPABASE_ORDER_BY:
+            print(
+                "SUPABASE_ORDER_BY is not set: pages without a unique sort key can overlap or skip rows. "
+                "Fetching them one at a time; set it to a unique column such as the primary key."
+            )
+            workers = 1
+        if starts:
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_fetch_supabase_page, table_name, start, start + page_size - 1): start
+                    for start in starts
+                }
+                for future in as_completed(futures):
+                    pages[futures[future]] = pd.DataFrame(future.result().data)
+
+        data = pd.concat([pages[start] for start in sorted(pages)], ignore_index=True)
+        if len(data) != total:
+            raise ValueError(f"fetched {len(data)} rows but the table has {total}")
+        return data
     except Exception as e:
         print(f"Error loading data from Supabase REST client: {e}")
         return None
 
 
-def load_data_from_postgres(table_name: str = "mental_health_data"):
+# Process-wide SQLAlchemy engine shared by every database path
+_engine = None
+_engine_lock = threading.Lock()
+_pool_wait = {"connects": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+
+def get_engine():
     """
-    Load data from a Postgres database given by `DATABASE_URL`.
+    Return the shared, pooled SQLAlchemy engine for `DATABASE_URL`
+    (None if it is not set). The engine is created once per process.
     """
+    global _engine
+    if _engine is not None:
+        return _engine
+
     db_url = DATABASE_URL
     if not db_url:
         print("DATABASE_URL not set in environment. Cannot load from Postgres.")
@@ -65,10 +188,135 @@ def load_data_from_postgres(table_name: str = "mental_health_data"):
     if db_url.startswith("postgres://"):
         db_url = db_url.replace("postgres://", "postgresql://", 1)
 
+    with _engine_lock:
+        if _engine is None:
+            from sqlalchemy import create_engine
+            # Add connect_args for SSL which is required for Supabase
+            # (Postgres only; other URLs, e.g. the benchmark's SQLite file, take none)
+            connect_args = {'sslmode': 'require'} if db_url.startswith("postgresql") else {}
+            _engine = create_engine(
+                db_url,
+                connect_args=connect_args,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+    return _engine
+
+
+@contextmanager
+def db_connection():
+    """
+    Check out a connection from the shared pool, recording how long the
+    checkout waited (see pool_stats()).
+    """
+    engine = get_engine()
+    if engine is None:
+        raise ValueError("DATABASE_URL must be set to query Postgres")
+    start = time.perf_counter()
+    conn = engine.connect()
+    waited = time.perf_counter() - start
+    with _engine_lock:
+        _pool_wait["connects"] += 1
+        _pool_wait["total_wait"] += waited
+        _pool_wait["max_wait"] = max(_pool_wait["max_wait"], waited)
     try:
-        from sqlalchemy import create_engine, text
-        # Add connect_args for SSL which is required for Supabase
-        engine = create_engine(db_url, connect_args={'sslmode': 'require'})
+        yield conn
+    finally:
+        conn.close()
+
+
+def pool_stats():
+    """Connection pool statistics, for sizing the pool for concurrent users"""
+    stats = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "connects": _pool_wait["connects"],
+        "avg_wait_ms": 1000 * _pool_wait["total_wait"] / _pool_wait["connects"] if _pool_wait["connects"] else 0.0,
+        "max_wait_ms": 1000 * _pool_wait["max_wait"],
+    }
+    if _engine is not None:
+        pool = _engine.pool
+        stats["checked_out"] = pool.checkedout()
+        stats["checked_in"] = pool.checkedin()
+        stats["overflow"] = max(pool.overflow(), 0)
+    return stats
+
+
+def dispose_engine():
+    """Close every pooled connection (called when the process exits)"""
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+atexit.register(dispose_engine)
+
+
+# Tables whose `date` column drives incremental loading
+WATERMARK_TABLES = {"wellness_assessments": "wa", "activity_logs": "al"}
+
+
+def load_watermarks():
+    """
+    Return the latest `date` of every table in WATERMARK_TABLES
+    as {"wellness_assessments": date, "activity_logs": date} (None on error).
+    """
+    try:
+        from sqlalchemy import text
+        if get_engine() is None:
+            return None
+        watermarks = {}
+        with db_connection() as conn:
+            for table in WATERMARK_TABLES:
+                watermarks[table] = conn.execute(text(f"SELECT MAX(date) FROM {table}")).scalar()
+        return watermarks
+    except Exception as e:
+        print(f"Error loading watermarks from Postgres: {e}")
+        return None
+
+
+def _delta_sql(since, until):
+    """
+    WHERE clause selecting rows from the `since` day on and not newer than
+    `until` (both dicts as returned by load_watermarks()). The `since` day
+    itself is selected again: rows can still arrive for it after it was loaded.
+    """
+    newer = []
+    params = {}
+    for table, alias in WATERMARK_TABLES.items():
+        if since and since.get(table) is not None:
+            newer.append(f"{alias}.date >= :{alias}_since")
+            params[f"{alias}_since"] = since[table]
+    clauses = [f"({' OR '.join(newer)})"] if newer else []
+    for table, alias in WATERMARK_TABLES.items():
+        if until and until.get(table) is not None:
+            clauses.append(f"{alias}.date <= :{alias}_until")
+            params[f"{alias}_until"] = until[table]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def load_data_from_postgres(table_name: str = "mental_health_data", since=None, until=None):
+    """
+    Load data from a Postgres database given by `DATABASE_URL` as a DataFrame.
+    With `since` / `until` watermarks (see load_watermarks()) only the rows
+    whose assessment or activity date falls in that window (including the
+    `since` day) are returned.
+
+    Rows are streamed through a server-side cursor in batches of
+    LOAD_CHUNK_ROWS; every batch is converted to compact dtypes right away
+    (see schema.normalize_dtypes), so only one raw batch exists at a time.
+    The summed size of the raw batches is kept in `attrs["raw_bytes"]`.
+    """
+    try:
+        from sqlalchemy import text
+        if get_engine() is None:
+            return None
+        where, params = _delta_sql(since, until)
         query = text("""
             SELECT 
                 wa.stress_level,
@@ -84,29 +332,264 @@ def load_data_from_postgres(table_name: str = "mental_health_data"):
                 dls.productivity_score,
                 al.hours_used as device_hours_per_day,
                 al.phone_unlocks,
-                d.device_type
-            FROM users u
-            JOIN wellness_assessments wa ON u.user_id = wa.user_id
-            JOIN digital_lifestyle_scores dls ON wa.assessment_id = dls.assessment_id
-            JOIN activity_logs al ON u.user_id = al.user_id AND wa.date = al.date
-            JOIN devices d ON al.device_id = d.device_id
-            JOIN regions r ON u.region_id = r.region_id
-        """)
-        with engine.connect() as conn:
-            df = pd.read_sql_query(query, conn)
-        return df.to_dict(orient="records")
+                d.device_type,
+                wa.date
+        """ + JOIN_SQL + where)
+        chunks = []
+        raw_bytes = 0
+        with db_connection() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=LOAD_CHUNK_ROWS)
+            for chunk in pd.read_sql_query(query, conn, params=params, chunksize=LOAD_CHUNK_ROWS):
+                raw_bytes += schema.memory_usage(chunk)
+                chunks.append(schema.normalize_dtypes(chunk)[0])
+        if not chunks:
+            return pd.DataFrame(columns=list(COLUMN_SQL))
+        df = schema.concat_frames(*chunks)
+        df.attrs["raw_bytes"] = raw_bytes
+        return df
     except Exception as e:
         print(f"Error loading data from Postgres: {e}")
         return None
 
 
-def load_data(table_name: str = "mental_health_data", prefer_postgres: bool = True):
+def _group_sql(name):
+    """SQL expression for a dimension, with bucket columns expanded to CASE labels"""
+    spec = binning.BUCKETS.get(name)
+    if spec is None:
+        return COLUMN_SQL[name]
+
+    source = COLUMN_SQL[spec["source"]]
+    cases = []
+    for edge, inclusive, label in zip(spec["edges"], spec["lower_inclusive"], spec["labels"]):
+        op = "<=" if inclusive else "<"
+        cases.append(f"WHEN {source} {op} {edge} THEN '{label}'")
+    return f"CASE {' '.join(cases)} WHEN {source} IS NOT NULL THEN '{spec['labels'][-1]}' END"
+
+
+def _where_sql(filters):
+    """WHERE clause and bound parameters for {"gender": ..., "region": ...} filters"""
+    clauses = []
+    params = {}
+    for name, value in filters.items():
+        if value is None or value == "All":
+            continue
+        clauses.append(f"{COLUMN_SQL[name]} = :{name}")
+        params[name] = value
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def build_stats_query(by, metrics, filters=None):
+    """
+    Build one aggregation query returning count / mean / std of every metric
+    in `metrics` per value of `by`, with the filters applied as bound parameters.
+    """
+    group = _group_sql(by)
+    where, params = _where_sql(filters or {})
+    selects = [f"{group} AS {by}"]
+    for metric in metrics:
+        column = COLUMN_SQL[metric]
+        selects.append(f"COUNT({column}) AS {metric}_count")
+        selects.append(f"AVG({column}) AS {metric}_mean")
+        selects.append(f"STDDEV_SAMP({column}) AS {metric}_std")
+    sql = f"""
+            SELECT {', '.join(selects)}
+            {JOIN_SQL}
+            {where}
+            GROUP BY 1
+            HAVING {group} IS NOT NULL
+            ORDER BY 1
+    """
+    return sql, params
+
+
+def build_totals_query(metrics, filters=None):
+    """Build one query returning the row count and count / mean / std of every metric"""
+    where, params = _where_sql(filters or {})
+    selects = ["COUNT(*) AS row_count"]
+    for metric in metrics:
+        column = COLUMN_SQL[metric]
+        selects.append(f"COUNT({column}) AS {metric}_count")
+        selects.append(f"AVG({column}) AS {metric}_mean")
+        selects.append(f"STDDEV_SAMP({column}) AS {metric}_std")
+    sql = f"""
+            SELECT {', '.join(selects)}
+            {JOIN_SQL}
+            {where}
+    """
+    return sql, params
+
+
+def build_box_stats_query(by, metric, filters=None):
+    """
+    Build one query returning exact box statistics of `metric` per value of `by`:
+    quartiles (percentile_cont), mean, SD and whiskers ending at the most
+    extreme values within 1.5 IQR, like boxstats.exact_box_stats.
+    """
+    group = _group_sql(by)
+    where, params = _where_sql(filters or {})
+    value = f"CAST({COLUMN_SQL[metric]} AS DOUBLE PRECISION)"
+    sql = f"""
+            WITH data AS (
+                SELECT {group} AS grp, {value} AS value
+                {JOIN_SQL}
+                {where}
+            ),
+            quartiles AS (
+                SELECT
+                    grp,
+                    COUNT(*) AS count,
+                    percentile_cont(0.25) WITHIN GROUP (ORDER BY value) AS q1,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY value) AS median,
+                    percentile_cont(0.75) WITHIN GROUP (ORDER BY value) AS q3,
+                    AVG(value) AS mean,
+                    STDDEV_SAMP(value) AS sd
+                FROM data
+                WHERE grp IS NOT NULL AND value IS NOT NULL
+                GROUP BY grp
+            )
+            SELECT
+                q.grp AS {by}, q.count, q.q1, q.median, q.q3,
+                MIN(d.value) AS lowerfence, MAX(d.value) AS upperfence, q.mean, q.sd
+            FROM quartiles q
+            JOIN data d ON d.grp = q.grp
+                AND d.value BETWEEN q.q1 - 1.5 * (q.q3 - q.q1) AND q.q3 + 1.5 * (q.q3 - q.q1)
+            GROUP BY q.grp, q.count, q.q1, q.median, q.q3, q.mean, q.sd
+            ORDER BY 1
+    """
+    return sql, params
+
+
+def build_daily_trends_query(metrics):
+    """Build one query returning <metric>_sum / <metric>_count per date, gender and region"""
+    selects = [f"{COLUMN_SQL['date']} AS date", f"{COLUMN_SQL['gender']} AS gender", f"{COLUMN_SQL['region']} AS region"]
+    for metric in metrics:
+        column = f"CAST({COLUMN_SQL[metric]} AS DOUBLE PRECISION)"
+        selects.append(f"SUM({column}) AS {metric}_sum")
+        selects.append(f"COUNT({column}) AS {metric}_count")
+    sql = f"""
+            SELECT {', '.join(selects)}
+            {JOIN_SQL}
+            GROUP BY 1, 2, 3
+    """
+    return sql, {}
+
+
+def build_moments_query(columns):
+    """
+    Build one query returning, per gender and region, the count, sums and
+    cross-product sums (upper triangle) of `columns` over the rows where all of them are set
+    """
+    values = [f"CAST({COLUMN_SQL[c]} AS DOUBLE PRECISION)" for c in columns]
+    selects = [f"{COLUMN_SQL['gender']} AS gender", f"{COLUMN_SQL['region']} AS region", "COUNT(*) AS count"]
+    selects += [f"SUM({value}) AS sum_{i}" for i, value in enumerate(values)]
+    selects += [
+        f"SUM({values[i]} * {values[j]}) AS cross_{i}_{j}"
+        for i in range(len(values)) for j in range(i, len(values))
+    ]
+    complete = " AND ".join(f"{COLUMN_SQL[c]} IS NOT NULL" for c in columns)
+    sql = f"""
+            SELECT {', '.join(selects)}
+            {JOIN_SQL}
+            WHERE {complete}
+            GROUP BY 1, 2
+    """
+    return sql, {}
+
+
+class PostgresAggregates:
+    """
+    Aggregate source that pushes every chart aggregation down to Postgres.
+    Same interface as aggregation.AggregateCube (filter / stats / stats_many / totals / row_count),
+    so only the aggregated rows cross the network. Box statistics, daily trend
+    sums and correlation moments are pushed down as well, so no page but
+    Raw Data needs the rows. Results are memoized per instance and shared
+    with the instances returned by filter().
+    """
+
+    def __init__(self, filters=None, results=None, version=None):
+        self.filters = dict(filters or {})
+        self._results = {} if results is None else results
+        # Results are memoized per instance, so the instance creation time identifies their version
+        self.version = version or f"postgres-{time.time():.0f}"
+
+    def _query(self, key, sql, params):
+        if key not in self._results:
+            from sqlalchemy import text
+            with db_connection() as conn:
+                self._results[key] = pd.read_sql_query(text(sql), conn, params=params)
+        return self._results[key]
+
+    def _filter_key(self):
+        return tuple(sorted((k, v) for k, v in self.filters.items() if v not in (None, "All")))
+
+    def filter(self, **selections):
+        filters = dict(self.filters)
+        filters.update(selections)
+        return PostgresAggregates(filters, self._results, self.version)
+
+    def stats(self, by, metric):
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        sql, params = build_stats_query(by, metrics, self.filters)
+        result = self._query(("stats", by, tuple(metrics), self._filter_key()), sql, params).set_index(by)
+        return {
+            metric: result[[f"{metric}_count", f"{metric}_mean", f"{metric}_std"]]
+            .set_axis(["count", "mean", "std"], axis=1)
+            .astype("float64")
+            for metric in metrics
+        }
+
+    def totals(self):
+        sql, params = build_totals_query(METRICS, self.filters)
+        row = self._query(("totals", self._filter_key()), sql, params).iloc[0]
+        return pd.DataFrame(
+            {stat: [float(row[f"{m}_{stat}"]) for m in METRICS] for stat in ("count", "mean", "std")},
+            index=METRICS,
+        )
+
+    @property
+    def row_count(self):
+        sql, params = build_totals_query([], self.filters)
+        return int(self._query(("rows", self._filter_key()), sql, params).iloc[0]["row_count"])
+
+    def dimension_values(self, name):
+        """Distinct values of a dimension (ignoring the active filters)"""
+        column = COLUMN_SQL[name]
+        sql = f"SELECT DISTINCT {column} AS value {JOIN_SQL} WHERE {column} IS NOT NULL ORDER BY 1"
+        return list(self._query(("values", name), sql, {})["value"])
+
+    def box_stats(self, by, metric):
+        """Exact box statistics per value of `by` (same frame as boxstats.group_box_stats)"""
+        sql, params = build_box_stats_query(by, metric, self.filters)
+        result = self._query(("box", by, metric, self._filter_key()), sql, params).set_index(by)
+        result = result.astype("float64")
+        result["count"] = result["count"].astype("int64")
+        result["approximate"] = False
+        return result
+
+    def daily_trends(self):
+        """DailyAggregates of the trend metrics (see trends.py), over every row"""
+        import trends
+        sql, params = build_daily_trends_query(trends.TREND_METRICS)
+        return trends.DailyAggregates.from_sums(self._query(("daily",), sql, params))
+
+    def segment_moments(self):
+        """correlation.SegmentMoments of the numeric columns per gender x region segment"""
+        import correlation
+        sql, params = build_moments_query(correlation.COLUMNS)
+        return correlation.SegmentMoments.from_sums(self._query(("moments",), sql, params))
+
+
+def load_data(table_name: str = "mental_health_data", prefer_postgres: bool = True, since=None, until=None):
     """
     Unified loader: try Postgres first, otherwise fall back to Supabase REST client.
+    Incremental loads (`since` set) are only supported by Postgres.
     """
     if prefer_postgres and DATABASE_URL:
-        data = load_data_from_postgres(table_name)
-        if data is not None:
+        data = load_data_from_postgres(table_name, since=since, until=until)
+        if data is not None or since is not None:
             return data
 
     # fallback to Supabase REST
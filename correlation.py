@@ -0,0 +1,182 @@
+"""
+Correlation matrices and significance tests of the numeric columns per segment.
+
+SegmentMoments holds, for every gender x region segment, the row count,
+the column sums and the cross-product sums of the numeric columns (rows
+with a missing value are left out). They are built in one pass over the
+rows sorted by segment (np.add.reduceat), and any union of segments is a
+sum of them. Correlations, t statistics and p-values are then computed
+for all requested segments at once as stacked (segments, k, k) arrays.
+"""
+import numpy as np
+import pandas as pd
+
+import sampling
+from aggregation import METRICS
+
+# Numeric columns of the correlation matrix
+COLUMNS = list(METRICS)
+SEGMENT_DIMENSIONS = list(sampling.STRATA)
+
+# Rows per chunk when accumulating cross products (chunk x pairs float64 buffer)
+CHUNK_ROWS = 250_000
+
+# Pairs the analysis report makes claims about: (x, y, expected sign)
+REPORT_CLAIMS = [
+    ("device_hours_per_day", "stress_level", 1),
+    ("sleep_duration", "anxiety_score", -1),
+    ("phone_unlocks", "focus_score", -1),
+]
+
+
+class SegmentMoments:
+    """Row count, sums and cross-product sums of COLUMNS per gender x region segment"""
+
+    def __init__(self, segments, count, sums, cross, columns=COLUMNS):
+        self.segments = segments  # DataFrame: one row per segment with the segment dimensions
+        self.count = count        # (segments,)
+        self.sums = sums          # (segments, k)
+        self.cross = cross        # (segments, k, k)
+        self.columns = list(columns)
+
+    @classmethod
+    def from_frame(cls, df, columns=COLUMNS, chunk_rows=CHUNK_ROWS):
+        columns = [c for c in columns if c in df.columns]
+        codes, segments = sampling.stratum_codes(df)
+        k = len(columns)
+        pairs_i, pairs_j = np.triu_indices(k)
+        count = np.zeros(len(segments))
+        sums = np.zeros((len(segments), k))
+        cross = np.zeros((len(segments), len(pairs_i)))
+
+        # Small integer codes sort with a linear-time radix sort
+        order = np.argsort(codes.astype("int16"), kind="stable")
+        order = order[codes[order] >= 0]
+        values = df[columns]
+        for start in range(0, len(order), chunk_rows):
+            rows = order[start:start + chunk_rows]
+            x = values.iloc[rows].to_numpy(dtype="float64", na_value=np.nan)
+            complete = ~np.isnan(x).any(axis=1)
+            x[~complete] = 0.0
+            chunk_codes = codes[rows]
+            starts = np.flatnonzero(np.r_[True, chunk_codes[1:] != chunk_codes[:-1]])
+            ids = chunk_codes[starts]
+            count[ids] += np.add.reduceat(complete.astype("float64"), starts)
+            sums[ids] += np.add.reduceat(x, starts, axis=0)
+            cross[ids] += np.add.reduceat(x[:, pairs_i] * x[:, pairs_j], starts, axis=0)
+
+        full = np.zeros((len(segments), k, k))
+        full[:, pairs_i, pairs_j] = cross
+        full[:, pairs_j, pairs_i] = cross
+        present = count > 0
+        return cls(segments[present].reset_index(drop=True), count[present], sums[present], full[present], columns)
+
+    @classmethod
+    def from_sums(cls, table, columns=COLUMNS):
+        """
+        Build from a table with one row per segment holding count, sum_<i> and
+        cross_<i>_<j> (i <= j) for the columns in order (see config.build_moments_query)
+        """
+        k = len(columns)
+        table = table.dropna(subset=SEGMENT_DIMENSIONS)
+        table = table[table["count"] > 0].reset_index(drop=True)
+        sums = table[[f"sum_{i}" for i in range(k)]].to_numpy("float64")
+        cross = np.zeros((len(table), k, k))
+        for i, j in zip(*np.triu_indices(k)):
+            cross[:, i, j] = cross[:, j, i] = table[f"cross_{i}_{j}"].to_numpy("float64")
+        segments = table[SEGMENT_DIMENSIONS].astype(object)
+        return cls(segments, table["count"].to_numpy("float64"), sums, cross, columns)
+
+    def combine(self, by=(), **filters):
+        """
+        Moments per value of the dimensions in `by` (one "All" group when empty),
+        over the segments matching `filters`. Returns (labels, count, sums, cross).
+        """
+        selected = np.ones(len(self.segments), dtype=bool)
+        for name, value in filters.items():
+            if value not in (None, "All"):
+                selected &= (self.segments[name] == value).to_numpy()
+        segments = self.segments[selected]
+        if by:
+            keys = segments[list(by)].astype(str).agg(" / ".join, axis=1)
+        else:
+            keys = pd.Series("All", index=segments.index)
+        group, labels = pd.factorize(keys, sort=True)
+        membership = np.zeros((len(labels), len(segments)))
+        membership[group, np.arange(len(segments))] = 1.0
+        return (
+            list(labels),
+            membership @ self.count[selected],
+            membership @ self.sums[selected],
+            np.einsum("gs,sij->gij", membership, self.cross[selected]),
+        )
+
+
+def correlation_matrices(count, sums, cross):
+    """Pearson correlation matrices (groups, k, k) from stacked moments"""
+    n = count[:, None, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sums / count[:, None]
+        cov = (cross - n * mean[:, :, None] * mean[:, None, :]) / (n - 1)
+        sd = np.sqrt(np.clip(np.diagonal(cov, axis1=1, axis2=2), 0, None))
+        r = cov / (sd[:, :, None] * sd[:, None, :])
+    r = np.clip(r, -1.0, 1.0)
+    diagonal = np.arange(r.shape[1])
+    r[:, diagonal, diagonal] = np.where(sd > 0, 1.0, np.nan)
+    return r
+
+
+def p_values(r, count):
+    """Two-sided p-values of H0: no correlation (t test with n - 2 degrees of freedom)"""
+    df = (count - 2)[:, None, None] * np.ones_like(r)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt(df / (1 - r * r))
+    try:
+        from scipy import stats
+        p = 2 * stats.t.sf(np.abs(t), df)
+    except ImportError:
+        print("scipy package not found; using the normal approximation for p-values. Install with: pip install scipy")
+        from math import erfc
+        p = np.vectorize(lambda value: erfc(abs(value) / np.sqrt(2)) if np.isfinite(value) else 0.0)(t)
+    p = np.where(np.isnan(r) | (df < 1), np.nan, p)
+    diagonal = np.arange(r.shape[1])
+    p[:, diagonal, diagonal] = np.nan
+    return p
+
+
+def segment_correlations(moments, by=(), **filters):
+    """
+    {label: {"n": rows, "r": correlation DataFrame, "p": p-value DataFrame}}
+    for every group of `by` within the filter selection, computed together.
+    """
+    labels, count, sums, cross = moments.combine(by, **filters)
+    if not labels:
+        return {}
+    r = correlation_matrices(count, sums, cross)
+    p = p_values(r, count)
+    columns = moments.columns
+    return {
+        label: {
+            "n": int(count[g]),
+            "r": pd.DataFrame(r[g], index=columns, columns=columns),
+            "p": pd.DataFrame(p[g], index=columns, columns=columns),
+        }
+        for g, label in enumerate(labels)
+    }
+
+
+def claims_table(results, claims=REPORT_CLAIMS):
+    """One row per segment and report claim: r, p-value and whether the data supports the claim"""
+    records = []
+    for label, result in results.items():
+        for x, y, sign in claims:
+            r, p = result["r"].loc[x, y], result["p"].loc[x, y]
+            records.append({
+                "segment": label,
+                "pair": f"{x} ~ {y}",
+                "n": result["n"],
+                "r": r,
+                "p_value": p,
+                "supported": bool(np.sign(r) == sign and p < 0.05),
+            })
+    return pd.DataFrame.from_records(records, columns=["segment", "pair", "n", "r", "p_value", "supported"])
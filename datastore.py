@@ -0,0 +1,250 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+import aggregation
+import binning
+import config as cfg
+import filter_index
+import schema
+import snapshot
+import timing
+import trends
+
+# Fraction of the ttl after which the background refresher reloads, so data is renewed before it expires
+REFRESH_AHEAD = 0.8
+# Seconds to wait before retrying a failed background refresh
+RETRY_AFTER = 30
+
+
+# Every session reads the same Dataset; with copy-on-write a write through any
+# frame derived from it copies instead of changing the shared data (default from pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# One immutable dataset version: rows, aggregate cube, filter index and daily trend aggregates
+Dataset = namedtuple("Dataset", ["df", "cube", "index", "daily", "version"])
+
+
+def frame_version(df):
+    """Content hash of a DataFrame, used as dataset version"""
+    return str(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+class IncrementalStore:
+    """
+    Holds the loaded dataset with its aggregate cube, filter index and daily
+    trend aggregates (see trends.py), and keeps them up to date
+    by loading only the rows from the last watermark day on
+    (see config.load_watermarks). A full reload only happens on the first
+    load, when no watermark is available (e.g. Supabase REST fallback) or
+    when full_reload() is called explicitly.
+
+    Every new version is persisted as an on-disk snapshot (see snapshot.py).
+    On a cold start the snapshot is read and served right away while
+    the database refresh runs in a background thread.
+
+    After the first load, refreshes only run in the background (a worker
+    refreshes ahead of the ttl; stale reads trigger one too). Readers always
+    get the last good Dataset, which is replaced in a single assignment, and
+    a failed refresh keeps it in place.
+    """
+
+    def __init__(self, table_name="mental_health_data"):
+        self.table_name = table_name
+        self.df = None
+        self.cube = None
+        self.index = None
+        self.daily = None
+        self.current = Dataset(None, None, None, None, None)
+        self.version = None
+        self.watermark = None
+        self.loaded_at = 0.0
+        self.from_snapshot = False
+        self.memory_report = None
+        self.last_attempt = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._first_load = threading.Lock()
+        self._refresh_thread = None
+        self._worker = None
+
+    def _prepare(self, data, version_seed=""):
+        with timing.span("prepare", rows=len(data)):
+            raw_bytes = getattr(data, "attrs", {}).get("raw_bytes")
+            df, report = schema.normalize_dtypes(pd.DataFrame(data))
+            if raw_bytes is not None:
+                # Postgres batches are normalized while streaming; report their size as loaded
+                report["before"] = raw_bytes
+            print(
+                f"Loaded {len(df)} rows: {report['before'] / 1e6:.1f} MB as loaded, "
+                f"{report['after'] / 1e6:.1f} MB after dtype normalization"
+            )
+            version = frame_version(df)
+            if version_seed:
+                version = hashlib.sha1(f"{version_seed}:{version}".encode()).hexdigest()[:16]
+            df = binning.add_bucket_columns(df, version=version)
+        return df, version, report
+
+    def _publish(self, df, cube, index, daily, version, watermark, persist=True):
+        """Swap in a new dataset version and persist it as a snapshot"""
+        df.attrs["version"] = version
+        self.df = df
+        self.cube = cube
+        self.index = index
+        self.daily = daily
+        self.current = Dataset(df, cube, index, daily, version)
+        self.version = version
+        self.watermark = watermark
+        self.loaded_at = time.time()
+        self.from_snapshot = not persist
+        if persist:
+            snapshot.save_snapshot(df, version, watermark)
+
+    def load_snapshot(self):
+        """Serve the on-disk snapshot if there is one (True when it was loaded)"""
+        loaded = snapshot.load_snapshot()
+        if loaded is None:
+            return False
+        df, version, watermark = loaded
+        with self._lock:
+            if self.df is None:
+                # The rows as loaded are not known for a snapshot, only their size now
+                self.memory_report = {"before": None, "after": schema.memory_usage(df)}
+                self._publish(
+                    df, aggregation.AggregateCube.from_frame(df), filter_index.FilterIndex.from_frame(df),
+                    trends.DailyAggregates.from_frame(df), version, watermark, persist=False,
+                )
+        return True
+
+    @property
+    def refreshing(self):
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def _safe_refresh(self):
+        """refresh() that records failures instead of raising (the current dataset stays in place)"""
+        self.last_attempt = time.time()
+        try:
+            ok = self.refresh()
+            error = None if ok else "Data source returned no data"
+        except Exception as e:
+            print(f"Background refresh failed: {e}")
+            ok, error = False, str(e)
+        self.last_error = error
+        return ok
+
+    def refresh_in_background(self):
+        """Start a refresh in a daemon thread unless one is already running"""
+        if self.refreshing:
+            return
+        self._refresh_thread = threading.Thread(target=self._safe_refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def start_refresher(self, ttl):
+        """Start the worker that refreshes every REFRESH_AHEAD * ttl seconds (once per store)"""
+        if self._worker is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(max(ttl * REFRESH_AHEAD, 1))
+                if not self.refreshing:
+                    self._safe_refresh()
+
+        self._worker = threading.Thread(target=run, daemon=True, name="dataset-refresher")
+        self._worker.start()
+
+    def full_reload(self):
+        """Fetch the whole dataset again and rebuild every derived aggregate"""
+        with self._lock:
+            watermark = cfg.load_watermarks() if cfg.DATABASE_URL else None
+            with timing.span("load_data", mode="full"):
+                data = cfg.load_data(table_name=self.table_name, prefer_postgres=True, until=watermark)
+            if data is None or len(data) == 0:
+                return False
+            df, version, report = self._prepare(data)
+            self.memory_report = report
+            self._publish(
+                df, aggregation.AggregateCube.from_frame(df), filter_index.FilterIndex.from_frame(df),
+                trends.DailyAggregates.from_frame(df), version, watermark,
+            )
+            return True
+
+    def refresh(self):
+        """
+        Load the rows from the watermark day on and merge them into the cube
+        and the daily trend aggregates. The watermark day is loaded again
+        because rows can still arrive for it after it was loaded: the rows
+        already held for it are replaced. The tables are append-only, so an
+        unchanged row count from that day on means there is nothing new.
+        Falls back to a full reload when nothing has been loaded yet or no watermark exists.
+        """
+        if self.df is None or not self.watermark or "date" not in self.df.columns:
+            return self.full_reload()
+
+        with self._lock:
+            watermark = cfg.load_watermarks()
+            if not watermark:
+                return False
+
+            with timing.span("load_data", mode="delta"):
+                data = cfg.load_data(
+                    table_name=self.table_name, prefer_postgres=True,
+                    since=self.watermark, until=watermark,
+                )
+            if data is None:
+                return False
+            cutoff = pd.Timestamp(min(day for day in self.watermark.values() if day is not None))
+            stale = (self.df["date"] >= cutoff).to_numpy()
+            if len(data) == int(stale.sum()):
+                # Up to date: a snapshot being served is now confirmed by the database
+                self.watermark = watermark
+                self.loaded_at = time.time()
+                self.from_snapshot = False
+                return True
+
+            delta, version, report = self._prepare(data, version_seed=self.version)
+            df, cube, index, daily = self.df, self.cube, self.index, self.daily
+            before = self.memory_report and self.memory_report["before"]
+            if stale.any():
+                # Drop the rows of the reloaded days; the delta holds all of them again
+                cube = cube.subtract(aggregation.AggregateCube.from_frame(df[stale]))
+                df = df[~stale]
+                index = filter_index.FilterIndex.from_frame(df)
+                daily = daily.before(cutoff) if daily is not None else None
+            df = schema.concat_frames(df, delta)
+            cube = cube.merge(aggregation.AggregateCube.from_frame(delta))
+            index = index.extend(delta)
+            delta_daily = trends.DailyAggregates.from_frame(delta)
+            daily = daily.merge(delta_daily) if daily is not None else delta_daily
+            # Memory of the whole dataset, not of the delta ("before" scaled to the rows kept)
+            self.memory_report = {
+                "before": int(before * (~stale).sum() / len(stale)) + report["before"] if before is not None else None,
+                "after": schema.memory_usage(df),
+            }
+            self._publish(df, cube, index, daily, version, watermark)
+            return True
+
+    def get(self, ttl=600):
+        """
+        Return the current Dataset. Only the very first load (without a snapshot)
+        blocks, and concurrent readers wait for that one load instead of
+        starting their own; a Dataset older than `ttl` seconds is served while
+        it is refreshed in the background.
+        """
+        if self.df is None:
+            with self._first_load:
+                if self.df is None and self.load_snapshot():
+                    # Cold start: serve the snapshot, catch up with the database in the background
+                    self.refresh_in_background()
+                elif self.df is None:
+                    self._safe_refresh()
+        elif time.time() - self.loaded_at > ttl and time.time() - self.last_attempt > RETRY_AFTER:
+            # Stale while revalidate
+            self.refresh_in_background()
+        if self.df is not None:
+            self.start_refresher(ttl)
+        return self.current
@@ -0,0 +1,116 @@
+import threading
+
+import aggregation
+from aggregation import METRICS
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBSource:
+    """
+    Aggregate source that runs every chart aggregation as SQL in an in-process
+    DuckDB database over the loaded DataFrame (scanned in place, not copied).
+    Same interface as aggregation.AggregateCube. DuckDB executes the scans and
+    group-bys vectorized on all cores (DUCKDB_THREADS). Stats are built from
+    the same sum / sum-of-squares / count as the cube, so both engines agree
+    up to floating-point summation order.
+    """
+
+    def __init__(self, connection, table, columns, dimension_order, filters=None, version=None, lock=None):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.dimension_order = dimension_order  # {dimension: values in order of first appearance}
+        self.filters = dict(filters or {})
+        self.version = version
+        self._lock = lock or threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, version=None, threads=None):
+        """Register `df` (with bucket columns) in a new in-memory DuckDB database"""
+        import duckdb
+        connection = duckdb.connect(database=":memory:")
+        if threads:
+            connection.execute(f"SET threads TO {int(threads)}")
+        connection.register("dataset", df)
+        dimension_order = {
+            name: list(df[name].dropna().unique()) for name in aggregation.DIMENSIONS if name in df.columns
+        }
+        return cls(connection, "dataset", list(df.columns), dimension_order, version=version)
+
+    def _where(self):
+        clauses, params = [], []
+        for name, value in sorted(self.filters.items()):
+            if value is None or value == "All":
+                continue
+            clauses.append(f"{_quote(name)} = ?")
+            params.append(value)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _query(self, sql, params):
+        # Queries are serialized (the registered frame is only visible to this
+        # connection); each one still runs on all DuckDB threads
+        with self._lock:
+            return self.connection.execute(sql, params).df()
+
+    def _sums(self, metrics):
+        selects = []
+        for metric in metrics:
+            column = f"CAST({_quote(metric)} AS DOUBLE)"
+            selects += [
+                f"SUM({column}) AS {_quote(metric + '_sum')}",
+                f"SUM({column} * {column}) AS {_quote(metric + '_sumsq')}",
+                f"COUNT({column}) AS {_quote(metric + '_count')}",
+            ]
+        return selects
+
+    def filter(self, **selections):
+        filters = dict(self.filters)
+        filters.update(selections)
+        return DuckDBSource(
+            self.connection, self.table, self.columns, self.dimension_order, filters, self.version, self._lock
+        )
+
+    def stats(self, by, metric):
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        where, params = self._where()
+        sql = f"""
+            SELECT {_quote(by)}, {', '.join(self._sums(metrics))}
+            FROM {self.table}
+            {where}
+            GROUP BY {_quote(by)}
+            HAVING {_quote(by)} IS NOT NULL
+            ORDER BY {_quote(by)}
+        """
+        grouped = self._query(sql, params).set_index(by)
+        results = {}
+        for metric in metrics:
+            result = aggregation._stats_from_sums(
+                grouped[f"{metric}_sum"], grouped[f"{metric}_count"], grouped[f"{metric}_sumsq"]
+            )
+            result.index.name = by
+            results[metric] = result
+        return results
+
+    def totals(self):
+        metrics = [m for m in METRICS if m in self.columns]
+        where, params = self._where()
+        row = self._query(f"SELECT {', '.join(self._sums(metrics))} FROM {self.table} {where}", params).iloc[0]
+        return aggregation._stats_from_sums(
+            row[[f"{m}_sum" for m in metrics]].set_axis(metrics).astype("float64"),
+            row[[f"{m}_count" for m in metrics]].set_axis(metrics),
+            row[[f"{m}_sumsq" for m in metrics]].set_axis(metrics).astype("float64"),
+        )
+
+    @property
+    def row_count(self):
+        where, params = self._where()
+        return int(self._query(f"SELECT COUNT(*) AS n FROM {self.table} {where}", params).iloc[0]["n"])
+
+    def dimension_values(self, name):
+        """Distinct values of a dimension in order of first appearance (ignoring the active filters)"""
+        return list(self.dimension_order[name])
@@ -0,0 +1,402 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import aggregation
+import boxstats
+import config as cfg
+import correlation
+import datastore
+import duckdb_source
+import filter_index
+import sampling
+import summary
+import timing
+import trends
+
+
+def _filter_key(filters):
+    """Hashable form of a filter selection; "All" / None mean no filter"""
+    return tuple(sorted((k, v) for k, v in (filters or {}).items() if v not in (None, "All")))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of aggregation results keyed on (dataset version, request).
+    Entries of older versions are dropped as soon as a new version is seen.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def peek(self, version, key):
+        """(True, value) when the result is cached, else (False, None); nothing is computed"""
+        with self._lock:
+            key = (version, *key)
+            if version != self._version or key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+
+    def get_or_compute(self, version, key, compute):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            key = (version, *key)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            if version == self._version:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+class AnalyticsEngine:
+    """
+    Headless aggregation engine behind the dashboard charts and key metrics.
+    Owns the dataset (incremental store, or Postgres pushdown in aggregate query
+    mode) and caches every result per dataset version, so any number of
+    dashboard sessions or replicas asking the same question share one computation.
+
+    In approximate mode (datasets of at least APPROX_ROWS rows) stats, totals
+    and box statistics that are not computed yet are first answered from a
+    stratified sample (see sampling.py) while the exact result is computed in
+    the background; once it is cached it replaces the estimate.
+    """
+
+    def __init__(self, ttl=600, cache_entries=1024, box_by="income_level", box_metric="anxiety_score"):
+        self.ttl = ttl
+        self.store = datastore.IncrementalStore(table_name="mental_health_data")
+        self.cache = ResultCache(cache_entries)
+        self.box_by = box_by
+        self.box_metric = box_metric
+        self._pushdown = None
+        self._pushdown_version = None
+        self._row_pushdown = None
+        self._pushdown_at = 0.0
+        self._sketches = (None, None)
+        self._duckdb = (None, None)
+        self._summary_trends = (None, None)
+        self._sample = (None, None)
+        self._moments = (None, None)
+        self._pending = set()
+        self._refiner = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refine")
+        self._lock = threading.Lock()
+
+    def dataset(self):
+        """Current row-level Dataset (loads it on first use)"""
+        return self.store.get(ttl=self.ttl)
+
+    def source(self):
+        """
+        Aggregate source of the current version: the cube built from the rows or,
+        in aggregate query mode, the summary table (see summary.py) when it
+        exists and Postgres pushdown over the raw join otherwise. With
+        AGG_ENGINE="duckdb" the rows are queried through DuckDB instead of the cube.
+        """
+        if cfg.QUERY_MODE == "aggregate" and cfg.DATABASE_URL:
+            with self._lock:
+                if self._pushdown is None or time.time() - self._pushdown_at > self.ttl:
+                    if summary.summary_exists():
+                        self._pushdown, self._pushdown_version = summary.load_summary_cube()
+                    else:
+                        self._pushdown = cfg.PostgresAggregates()
+                        self._pushdown_version = self._pushdown.version
+                    # Box stats and correlation moments always come from the raw join
+                    self._row_pushdown = (
+                        self._pushdown if isinstance(self._pushdown, cfg.PostgresAggregates)
+                        else cfg.PostgresAggregates(version=self._pushdown_version)
+                    )
+                    self._pushdown_at = time.time()
+                return self._pushdown
+        dataset = self.dataset()
+        if cfg.AGG_ENGINE == "duckdb" and dataset.df is not None:
+            return self._duckdb_source(dataset)
+        return dataset.cube
+
+    def _duckdb_source(self, dataset):
+        """DuckDB source over the rows of `dataset`, created once per version (falls back to the cube)"""
+        with self._lock:
+            version, source = self._duckdb
+            if version != dataset.version:
+                try:
+                    source = duckdb_source.DuckDBSource.from_frame(
+                        dataset.df, version=dataset.version, threads=cfg.DUCKDB_THREADS
+                    )
+                except ImportError:
+                    print("duckdb package not found; using the pandas cube. Install with: pip install duckdb")
+                    source = dataset.cube
+                self._duckdb = (dataset.version, source)
+            return source
+
+    def _pushed_down(self):
+        """
+        Postgres source for the results that otherwise need the rows (box stats,
+        daily trends, correlation moments) in aggregate query mode, else None.
+        Only the Raw Data page loads rows in that mode.
+        """
+        if not (cfg.QUERY_MODE == "aggregate" and cfg.DATABASE_URL):
+            return None
+        self.source()
+        return self._row_pushdown
+
+    @property
+    def version(self):
+        source = self.source()
+        if source is None:
+            return None
+        return self._pushdown_version if source is self._pushdown else self.store.version
+
+    def approximate(self):
+        """True when results are estimated from the sample first (rows query mode, APPROX_ROWS reached)"""
+        if not cfg.APPROX_ROWS or (cfg.QUERY_MODE == "aggregate" and cfg.DATABASE_URL):
+            return False
+        dataset = self.dataset()
+        return dataset.df is not None and len(dataset.df) >= cfg.APPROX_ROWS
+
+    def sample(self):
+        """Stratified sample cube of the current dataset, drawn once per version"""
+        dataset = self.dataset()
+        with self._lock:
+            version, cube = self._sample
+            if version != dataset.version:
+                with timing.span("sample", rows=len(dataset.df)):
+                    cube = sampling.SampleCube.from_frame(
+                        dataset.df, cfg.APPROX_SAMPLE_ROWS, version=dataset.version
+                    )
+                self._sample = (dataset.version, cube)
+            return cube
+
+    @property
+    def refining(self):
+        """True while exact results are being computed in the background"""
+        with self._lock:
+            return bool(self._pending)
+
+    def _progressive(self, key, exact, estimate):
+        """The cached exact result, or (in approximate mode) an estimate while the exact one is computed"""
+        version = self.version
+        found, value = self.cache.peek(version, key)
+        if found:
+            return value
+        if not self.approximate():
+            return self.cache.get_or_compute(version, key, exact)
+        self._refine(version, key, exact)
+        return self.cache.get_or_compute(version, ("approximate", *key), estimate)
+
+    def _refine(self, version, key, exact):
+        with self._lock:
+            if (version, key) in self._pending:
+                return
+            self._pending.add((version, key))
+
+        def run():
+            try:
+                with timing.span("refine", key=key[0]):
+                    self.cache.get_or_compute(version, key, exact)
+            except Exception as e:
+                print(f"Computing the exact {key[0]} result failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard((version, key))
+
+        self._refiner.submit(run)
+
+    def _filtered(self, filters):
+        source = self.source()
+        if source is None:
+            raise RuntimeError("No data available")
+        return source.filter(**dict(_filter_key(filters)))
+
+    def meta(self, dimensions=filter_index.FILTER_DIMENSIONS):
+        """Version, total row count and the values of the filter dimensions"""
+        source = self.source()
+        if source is None:
+            return {"version": None, "row_count": 0, "dimensions": {}}
+        version = self.version
+        return self.cache.get_or_compute(version, ("meta", tuple(dimensions)), lambda: {
+            "version": version,
+            "row_count": source.row_count,
+            "dimensions": {name: source.dimension_values(name) for name in dimensions},
+        })
+
+    def stats_many(self, by, metrics, filters=None):
+        """{metric: count / mean / std per value of `by`} for a filter selection"""
+        metrics = list(metrics)
+        key = ("stats", by, tuple(metrics), _filter_key(filters))
+        return self._progressive(
+            key,
+            lambda: aggregation.group_stats_many(self._filtered(filters), by, metrics),
+            lambda: self.sample().filter(**dict(_filter_key(filters))).stats_many(by, metrics),
+        )
+
+    def totals(self, filters=None):
+        """Overall count / mean / std of every metric (the key metrics)"""
+        return self._progressive(
+            ("totals", _filter_key(filters)),
+            lambda: self._filtered(filters).totals(),
+            lambda: self.sample().filter(**dict(_filter_key(filters))).totals(),
+        )
+
+    def row_count(self, filters=None):
+        return self.cache.get_or_compute(
+            self.version, ("rows", _filter_key(filters)), lambda: self._filtered(filters).row_count
+        )
+
+    def box_stats(self, by, metric, filters=None):
+        """Box statistics per group, from per-segment sketches plus exact stats for small groups"""
+        return self._progressive(
+            ("box", by, metric, _filter_key(filters)),
+            lambda: self._box_stats(by, metric, filters),
+            lambda: self.sample().filter(**dict(_filter_key(filters))).box_stats(by, metric),
+        )
+
+    def _box_stats(self, by, metric, filters):
+        pushed_down = self._pushed_down()
+        if pushed_down is not None:
+            return pushed_down.filter(**dict(_filter_key(filters))).box_stats(by, metric)
+        dataset = self.dataset()
+        if dataset.df is None:
+            raise RuntimeError("No data available")
+        selections = dict(_filter_key(filters))
+        if (by, metric) != (self.box_by, self.box_metric):
+            rows = dataset.index.view(dataset.df, **selections).frame([by, metric])
+            return boxstats.group_box_stats(rows, by, metric)
+
+        with self._lock:
+            version, sketches = self._sketches
+            if version != dataset.version:
+                sketches = boxstats.SketchIndex.from_frame(dataset.df, by=by, metric=metric)
+                self._sketches = (dataset.version, sketches)
+        rows = lambda: dataset.index.view(dataset.df, **selections).frame([by, metric])
+        return sketches.view(rows=rows, **selections).box_stats(by, metric)
+
+
+    def correlations(self, by=(), filters=None):
+        """Correlation matrices and p-values of the numeric columns per value of `by` (see correlation.py)"""
+        by = tuple(by)
+        return self.cache.get_or_compute(
+            self.version, ("correlations", by, _filter_key(filters)),
+            lambda: correlation.segment_correlations(self._segment_moments(), by, **dict(_filter_key(filters))),
+        )
+
+    def _segment_moments(self):
+        """Per-segment moments of the rows, computed once per dataset version"""
+        pushed_down = self._pushed_down()
+        if pushed_down is not None:
+            return pushed_down.segment_moments()
+        dataset = self.dataset()
+        if dataset.df is None:
+            raise RuntimeError("No data available")
+        with self._lock:
+            version, moments = self._moments
+            if version != dataset.version:
+                with timing.span("moments", rows=len(dataset.df)):
+                    moments = correlation.SegmentMoments.from_frame(dataset.df)
+                self._moments = (dataset.version, moments)
+            return moments
+
+    def trend(self, metric, resolution="Daily", window=1, split_by=None, filters=None,
+              max_points=trends.MAX_POINTS):
+        """Downsampled mean of `metric` over time, one column per value of `split_by`"""
+        key = ("trend", metric, resolution, int(window), split_by, max_points, _filter_key(filters))
+        return self.cache.get_or_compute(
+            self.version, key, lambda: self._trend(metric, resolution, window, split_by, filters, max_points)
+        )
+
+    def _trend(self, metric, resolution, window, split_by, filters, max_points):
+        daily = self._daily_aggregates()
+        if daily is None:
+            raise RuntimeError("The dataset has no dates")
+        series = daily.series(metric, resolution, window, split_by, **dict(_filter_key(filters)))
+        return trends.downsample(series, max_points)
+
+    def _daily_aggregates(self):
+        """
+        Daily trend aggregates: from the summary table when the charts use it,
+        pushed down to Postgres in aggregate query mode without one, else from the rows
+        """
+        source = self.source()
+        if source is not None and source is self._pushdown and self._pushdown_version.startswith("summary-"):
+            with self._lock:
+                version, daily = self._summary_trends
+                if version != self._pushdown_version:
+                    daily = summary.load_daily_trends()
+                    self._summary_trends = (self._pushdown_version, daily)
+            return daily
+        pushed_down = self._pushed_down()
+        if pushed_down is not None:
+            return pushed_down.daily_trends()
+        return self.dataset().daily
+
+
+class EngineSource:
+    """
+    In-process aggregate source over an AnalyticsEngine for one filter selection.
+    Same interface as service.RemoteSource, so the dashboard reads the engine
+    the same way whether it runs in the dashboard process or behind the HTTP API.
+    """
+
+    def __init__(self, engine, filters=None):
+        self.engine = engine
+        self.filters = dict(filters or {})
+        self.meta = engine.meta()
+        self.version = self.meta["version"]
+
+    def filter(self, **selections):
+        filters = dict(self.filters)
+        filters.update(selections)
+        return EngineSource(self.engine, filters)
+
+    def stats(self, by, metric):
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        return self.engine.stats_many(by, metrics, self.filters)
+
+    def totals(self):
+        return self.engine.totals(self.filters)
+
+    def box_stats(self, by, metric):
+        return self.engine.box_stats(by, metric, self.filters)
+
+    def trend(self, metric, resolution="Daily", window=1, split_by=None):
+        return self.engine.trend(metric, resolution, window, split_by, self.filters)
+
+    def correlations(self, by=()):
+        return self.engine.correlations(by, self.filters)
+
+    def refining(self):
+        return self.engine.refining
+
+    @property
+    def row_count(self):
+        return self.engine.row_count(self.filters)
+
+    def dimension_values(self, name):
+        return list(self.meta["dimensions"][name])
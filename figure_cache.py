@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of serialized Plotly figures keyed on
+    (chart id, filter values, dataset version). Shared by every session in
+    the process; entries of older dataset versions are dropped as soon as a
+    new version is seen.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, version=None):
+        """Drop every entry (or only those not belonging to `version`)"""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[-1] != version]:
+                    del self._entries[key]
+            self._version = version
+
+    def get_or_build(self, chart_id, filters, version, build, keep=None):
+        """
+        Return the cached figure for the key, or build, cache and return it.
+        Built figures for which `keep(fig)` is false are returned without being cached.
+        """
+        if version != self._version:
+            self.invalidate(version)
+
+        key = (chart_id, tuple(filters), version)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if payload is not None:
+            return pio.from_json(payload)
+
+        fig = build()
+        if keep is not None and not keep(fig):
+            with self._lock:
+                self.misses += 1
+            return fig
+        payload = fig.to_json()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+    def stats(self):
+        """Hit / miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "payload_bytes": sum(len(p) for p in self._entries.values()),
+            }
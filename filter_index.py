@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard filters on
+FILTER_DIMENSIONS = ["gender", "region"]
+
+
+def _positions_by_value(series, offset=0):
+    """Map every value of a column to the sorted row positions holding it"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # Missing values (code -1) sort first; skip them
+    start = int((codes < 0).sum())
+    positions = {}
+    for value, count in zip(uniques, counts):
+        rows = order[start:start + count].astype(np.int64) + offset
+        rows.flags.writeable = False
+        positions[value] = rows
+        start += count
+    return positions
+
+
+class FilteredView:
+    """
+    Read-only selection of rows of a dataset. Only the requested columns
+    of the selected rows are materialized, and the source frame is never copied.
+    """
+
+    def __init__(self, df, positions):
+        self.df = df
+        self.positions = positions  # None means every row
+
+    def __len__(self):
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    def take(self, selection, columns=None):
+        """DataFrame with the given columns for selected rows at positions `selection` (relative to the view)"""
+        columns = list(self.df.columns) if columns is None else columns
+        rows = selection if self.positions is None else self.positions[selection]
+        return self.df[columns].take(rows)
+
+    def frame(self, columns=None, start=0, stop=None):
+        """DataFrame with the given columns for the selected rows[start:stop]"""
+        columns = list(self.df.columns) if columns is None else columns
+        if self.positions is None:
+            return self.df[columns].iloc[start:stop]
+        return self.df[columns].take(self.positions[start:stop])
+
+
+class FilterIndex:
+    """
+    Per-value row positions of the filter dimensions, built once per dataset version.
+    Filtering is an intersection of sorted position arrays instead of a
+    boolean scan of string columns.
+    """
+
+    def __init__(self, positions, length):
+        self.positions = positions  # {dimension: {value: positions}}
+        self.length = length
+
+    @classmethod
+    def from_frame(cls, df, dimensions=FILTER_DIMENSIONS):
+        positions = {dim: _positions_by_value(df[dim]) for dim in dimensions if dim in df.columns}
+        return cls(positions, len(df))
+
+    def extend(self, delta):
+        """Return an index that also covers `delta`, appended after the current rows"""
+        positions = {}
+        for dim, by_value in self.positions.items():
+            merged = dict(by_value)
+            for value, rows in _positions_by_value(delta[dim], offset=self.length).items():
+                combined = np.concatenate([merged[value], rows]) if value in merged else rows
+                combined.flags.writeable = False
+                merged[value] = combined
+            positions[dim] = merged
+        return FilterIndex(positions, self.length + len(delta))
+
+    def select(self, **selections):
+        """
+        Row positions matching every selection, e.g. select(gender="Male", region="Asia").
+        "All" or None means no filter; returns None when no filter is active.
+        """
+        result = None
+        for dim, value in selections.items():
+            if value is None or value == "All":
+                continue
+            rows = self.positions[dim].get(value, np.empty(0, dtype=np.int64))
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def view(self, df, **selections):
+        """Read-only FilteredView of `df` for the given selections"""
+        return FilteredView(df, self.select(**selections))
@@ -1,3 +1,6 @@
+import functools
+import os
+import time
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -17,6 +20,25 @@ except ImportError:
     st.error("Config module not found.")
     st.stop()
 
+import binning
+import correlation
+import aggregation
+import engine
+import filter_index
+import figure_cache
+import planner
+import rawdata
+import sampling
+import service
+import timing
+import trends
+from charts import (
+    page_requirements, is_approximate,
+    plot_device_usage_vs_stress, plot_sleep_vs_anxiety, plot_device_type_vs_productivity,
+    plot_region_vs_happiness, plot_education_vs_dependence, plot_gender_vs_stress,
+    plot_phone_unlocks_vs_focus, plot_income_vs_anxiety, plot_trend, plot_correlation_matrix,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Mental Health & Digital Usage Dashboard",
@@ -211,278 +233,130 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=600)
+@st.cache_resource
+def get_analytics_engine():
+    """Process-wide analytics engine: dataset, aggregations and their result cache (shared by all sessions)"""
+    return engine.AnalyticsEngine(ttl=600)
+
+def get_store():
+    """Process-wide incremental data store owned by the analytics engine"""
+    return get_analytics_engine().store
+
 def load_data():
-    """Load data from database (prefer Postgres) with caching"""
-    data = cfg.load_data(table_name="mental_health_data", prefer_postgres=True)
-    if data:
-        return pd.DataFrame(data)
-    else:
+    """Load data from database (prefer Postgres), appending new rows every 10 minutes"""
+    dataset = get_analytics_engine().dataset()
+    if dataset.df is None:
         st.error("Could not connect to database/Supabase.")
-        return None
+    return dataset
 
-def categorize_device_hours(hours):
-    """Categorize device usage hours"""
-    if hours <= 2:
-        return "0-2 hours"
-    elif hours <= 5:
-        return "3-5 hours"
-    elif hours <= 8:
-        return "6-8 hours"
-    else:
-        return ">8 hours"
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide LRU cache of rendered figures (shared by all sessions)"""
+    return figure_cache.FigureCache(max_entries=256)
 
-def categorize_sleep(hours):
-    """Categorize sleep duration"""
-    if hours < 6:
-        return "<6 hours"
-    elif hours <= 7:
-        return "6-7 hours"
-    elif hours <= 8:
-        return "7-8 hours"
-    else:
-        return ">8 hours"
+def load_source():
+    """
+    Return (dataset, source): the row-level dataset (None when the charts come from
+    the analytics service or Postgres pushdown, where rows are only loaded for the
+    Raw Data page) and the analytics engine source the charts are computed from.
+    """
+    if cfg.ANALYTICS_SERVICE_URL:
+        return None, service.RemoteSource(cfg.ANALYTICS_SERVICE_URL)
 
-def categorize_unlocks(unlocks):
-    """Categorize phone unlocks"""
-    if unlocks <= 20:
-        return "0-20"
-    elif unlocks <= 50:
-        return "21-50"
-    elif unlocks <= 80:
-        return "51-80"
-    else:
-        return ">80"
+    dataset = None
+    if not (cfg.QUERY_MODE == "aggregate" and cfg.DATABASE_URL):
+        dataset = load_data()
+        if dataset.df is None or dataset.df.empty:
+            return None, None
+    return dataset, engine.EngineSource(get_analytics_engine())
 
-# ========== VISUALIZATION FUNCTIONS ==========
+def show_chart(plot_fn, source, chart_state, name=None):
+    """
+    Render a chart through the process-wide figure cache.
+    `source` is passed to `plot_fn`; a zero-argument callable is only evaluated on a cache miss.
+    `chart_state` is (filter values, dataset version); `name` defaults to the name of `plot_fn`.
+    """
+    filters, version = chart_state
 
-def common_layout_updates(fig, title):
-    """Apply consistent modern styling to all charts"""
-    fig.update_layout(
-        title={'text': f'<b>{title}</b>', 'font': {'size': 18, 'color': '#2d3748', 'family': 'Inter'}},
-        template='plotly_white',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(family='Inter', color='#2d3748', size=12),
-        margin=dict(l=20, r=20, t=50, b=50),  # Increased bottom margin
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-        xaxis=dict(fixedrange=True),  # Disable zoom/pan on X
-        yaxis=dict(fixedrange=True),  # Disable zoom/pan on Y
-        dragmode=False  # Disable drag interactions entirely
-    )
-    return fig
+    name = name or plot_fn.__name__
 
-def plot_device_usage_vs_stress(df):
-    """1. Device Usage vs Stress Level - Line Chart"""
-    df['device_category'] = df['device_hours_per_day'].apply(categorize_device_hours)
-    
-    # Calculate average stress per category
-    category_order = ["0-2 hours", "3-5 hours", "6-8 hours", ">8 hours"]
-    grouped = df.groupby('device_category')['stress_level'].mean().reindex(category_order)
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=grouped.index,
-        y=grouped.values,
-        mode='lines+markers',
-        name='Avg Stress Level',
-        line=dict(color='#667eea', width=4, shape='spline'),
-        marker=dict(size=10, color='#667eea', line=dict(color='white', width=2)),
-        fill='tozeroy',
-        fillcolor='rgba(102, 126, 234, 0.1)'
-    ))
-    
-    fig = common_layout_updates(fig, 'Device Usage vs Stress Level')
-    fig.update_layout(height=350)
-    return fig
+    def build():
+        with timing.span(f"plot.{name}"):
+            return plot_fn(source() if callable(source) else source)
 
-def plot_sleep_vs_anxiety(df):
-    """2. Sleep Duration vs Anxiety Score - Column Bar Chart"""
-    df['sleep_category'] = df['sleep_duration'].apply(categorize_sleep)
-    
-    category_order = ["<6 hours", "6-7 hours", "7-8 hours", ">8 hours"]
-    grouped = df.groupby('sleep_category')['anxiety_score'].mean().reindex(category_order)
-    
-    colors = ['#ff6b9d', '#ffa500', '#6bcb77', '#4d96ff']
-    
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=grouped.index,
-        y=grouped.values,
-        marker=dict(color=colors, line=dict(color='white', width=2)),
-        text=grouped.values.round(2),
-        textposition='auto',
-    ))
-    
-    fig = common_layout_updates(fig, 'Sleep Duration vs Anxiety')
-    fig.update_layout(height=350)
-    return fig
+    # Approximate figures are not cached, so the exact one replaces them once it is ready
+    fig = get_figure_cache().get_or_build(name, filters, version, build, keep=lambda f: not is_approximate(f))
+    with timing.span(f"render.{name}"):
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    show_status(name, is_approximate(fig))
 
-def plot_device_type_vs_productivity(df):
-    """3. Device Type vs Productivity Score - Horizontal Bar Chart"""
-    grouped = df.groupby('device_type')['productivity_score'].mean().sort_values()
-    
-    colors = ['#c780fa', '#ff6b9d', '#ffa500', '#6bcb77']
-    
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        y=grouped.index,
-        x=grouped.values,
-        orientation='h',
-        marker=dict(color=colors[:len(grouped)], line=dict(color='white', width=2)),
-        text=grouped.values.round(2),
-        textposition='auto',
-    ))
-    
-    fig = common_layout_updates(fig, 'Device Type vs Productivity')
-    fig.update_layout(height=350)
-    return fig
+def show_status(name, approximate):
+    """Per-chart approximate / final indicator (shown in approximate mode only)"""
+    if approximate:
+        st.session_state["approximate_charts"].append(name)
+        st.caption("≈ Approximate: estimated from a stratified sample (95% confidence intervals); refining…")
+    elif cfg.APPROX_ROWS:
+        st.caption("✓ Final")
 
-def plot_region_vs_happiness(df):
-    """4. Region vs Happiness Score - Pie Chart"""
-    grouped = df.groupby('region')['happiness_score'].mean()
-    
-    fig = go.Figure()
-    fig.add_trace(go.Pie(
-        labels=grouped.index,
-        values=grouped.values,
-        hole=0.5,
-        marker=dict(colors=['#667eea', '#764ba2', '#ff6b9d', '#ffa500', '#6bcb77', '#4d96ff'], 
-                   line=dict(color='white', width=2)),
-        textinfo='percent',
-        hoverinfo='label+value'
-    ))
-    
-    # Specific layout for Pie chart to handle legend overlap
-    fig.update_layout(
-        title={'text': '<b>Happiness by Region</b>', 'font': {'size': 18, 'color': '#2d3748', 'family': 'Inter'}},
-        template='plotly_white',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(family='Inter', color='#2d3748', size=12),
-        margin=dict(l=10, r=10, t=60, b=150),  # Ample bottom margin for 3 rows
-        height=600,
-        legend=dict(
-            orientation="h", 
-            yanchor="top", 
-            y=-0.1, 
-            xanchor="center", 
-            x=0.5,
-            entrywidth=0.45,  # Force 2 columns (45% width each)
-            entrywidthmode='fraction',
-            font=dict(size=11)
-        ),
-        dragmode=False
-    )
-    # Update trace to add padding around the circle itself
-    fig.update_traces(domain=dict(x=[0.1, 0.9], y=[0.1, 0.9])) 
-    return fig
-
-def plot_education_vs_dependence(df):
-    """5. Education Level vs Digital Dependence Score - Radar Chart"""
-    education_order = ['High School', 'Bachelor', 'Master', 'PhD']
-    grouped = df.groupby('education_level')['digital_dependence_score'].mean().reindex(education_order)
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(
-        r=grouped.values,
-        theta=grouped.index,
-        fill='toself',
-        name='Digital Dependence',
-        line=dict(color='#764ba2', width=3),
-        fillcolor='rgba(118, 75, 162, 0.3)',
-        marker=dict(size=8, color='#764ba2')
-    ))
-    
-    fig = common_layout_updates(fig, 'Education vs Digital Dependence')
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(visible=True, range=[0, grouped.max() * 1.2]),
-            bgcolor='rgba(0,0,0,0)'
-        ),
-        height=400
-    )
-    return fig
+@st.fragment(run_every=2)
+def refine_charts(source):
+    """Rerun the app once the exact results computed in the background are ready"""
+    if not source.refining():
+        st.rerun()
 
-def plot_gender_vs_stress(df):
-    """6. Gender vs Stress Level - Clustered Bar Chart"""
-    grouped = df.groupby('gender')['stress_level'].agg(['mean', 'std']).reset_index()
-    
-    colors_map = {'Male': '#4d96ff', 'Female': '#ff6b9d', 'Non-binary': '#6bcb77'}
-    colors = [colors_map.get(g, '#ffa500') for g in grouped['gender']]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=grouped['gender'],
-        y=grouped['mean'],
-        name='Average Stress',
-        marker=dict(color=colors, line=dict(color='white', width=2)),
-        text=grouped['mean'].round(2),
-        textposition='auto',
-    ))
-    
-    fig = common_layout_updates(fig, 'Gender vs Stress Level')
-    fig.update_layout(height=350)
-    return fig
+def show_perf_panel(panel, trace):
+    """Fill the sidebar performance panel with this run's spans and the process-wide p50/p95"""
+    with panel.expander("⏱️ Performance", expanded=True):
+        if trace:
+            run = pd.DataFrame(trace, columns=["stage", "seconds"]).groupby("stage", sort=False)["seconds"].sum()
+            st.caption(f"This run: {run.sum() * 1000:.0f} ms in timed stages")
+            st.dataframe((run * 1000).round(1).rename("ms"), use_container_width=True)
+        summary = pd.DataFrame.from_dict(timing.TIMINGS.summary(), orient="index")
+        if not summary.empty:
+            st.caption("All sessions (recent samples)")
+            st.dataframe(summary[["count", "p50_ms", "p95_ms"]], use_container_width=True)
 
-def plot_phone_unlocks_vs_focus(df):
-    """7. Phone Unlocks vs Focus Score - Line Chart"""
-    df['unlock_category'] = df['phone_unlocks'].apply(categorize_unlocks)
-    
-    category_order = ["0-20", "21-50", "51-80", ">80"]
-    grouped = df.groupby('unlock_category')['focus_score'].mean().reindex(category_order)
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=grouped.index,
-        y=grouped.values,
-        mode='lines+markers',
-        name='Avg Focus',
-        line=dict(color='#ffa500', width=4, shape='spline'),
-        marker=dict(size=10, color='#ffa500', line=dict(color='white', width=2)),
-        fill='tozeroy',
-        fillcolor='rgba(255, 165, 0, 0.1)'
-    ))
-    
-    fig = common_layout_updates(fig, 'Phone Unlocks vs Focus')
-    fig.update_layout(height=350)
-    return fig
+@st.cache_resource(max_entries=8)
+def load_sort_order(version, gender, region, sort_by, ascending, _rows):
+    """Sorted row order of a filtered selection, cached per dataset version and filters"""
+    return rawdata.sort_order(_rows, sort_by, ascending)
 
-def plot_income_vs_anxiety(df):
-    """8. Income Level vs Anxiety Score - Box Plot"""
-    income_order = ['Low', 'Lower-Mid', 'Upper-Mid', 'High']
-    colors = {'Low': '#ff6b9d', 'Lower-Mid': '#ffa500', 'Upper-Mid': '#6bcb77', 'High': '#4d96ff'}
-    
-    fig = go.Figure()
-    
-    for income in income_order:
-        data = df[df['income_level'] == income]['anxiety_score']
-        fig.add_trace(go.Box(
-            y=data,
-            name=income,
-            marker=dict(color=colors.get(income, '#999999')),
-            boxmean='sd'
-        ))
-    
-    fig = common_layout_updates(fig, 'Income vs Anxiety Distribution')
-    fig.update_layout(height=350, showlegend=False)
-    return fig
+def filter_rows(dataset, gender, region):
+    """
+    Read-only view of the rows matching the gender/region filter, using the
+    dataset's precomputed filter index. Loads the rows on demand in aggregate query mode.
+    """
+    if dataset is None:
+        dataset = load_data()
+    if dataset.df is None:
+        return filter_index.FilteredView(pd.DataFrame(columns=list(cfg.COLUMN_SQL)), None)
+    return dataset.index.view(dataset.df, gender=gender, region=region)
 
 # ========== MAIN APP ==========
 
 def main():
+    # Spans of this run, shown in the sidebar performance panel when enabled
+    trace = timing.start_trace()
+    # Charts of this run that were drawn from the sample
+    st.session_state["approximate_charts"] = []
+    
     # Load data
     with st.spinner("Loading data from Supabase..."):
-        df = load_data()
-    
-    if df is not None and not df.empty:
+        try:
+            dataset, cube = load_source()
+            total_records = cube.row_count if cube is not None else 0
+        except Exception as e:
+            st.error(f"Could not query database: {e}")
+            dataset, cube, total_records = None, None, 0
+    
+    if total_records > 0:
         # Sidebar navigation
         st.sidebar.title("📊 Dashboard")
         st.sidebar.markdown("---")
         
         page = st.sidebar.radio(
             "Navigation",
-            ["Dashboard", "Device Usage", "Sleep & Mental Health", "Demographics", "Behavioral Patterns", "Raw Data"],
+            ["Dashboard", "Device Usage", "Sleep & Mental Health", "Demographics", "Behavioral Patterns", "Trends", "Statistics", "Raw Data"],
             index=0
         )
         
@@ -503,10 +377,50 @@ def main():
                 <p style='color: #ffffff; 
                           font-size: 32px; 
                           font-weight: 700; 
-                          margin: 8px 0 0 0;'>{len(df)}</p>
+                          margin: 8px 0 0 0;'>{total_records}</p>
             </div>
         """, unsafe_allow_html=True)
         
+        memory_report = get_store().memory_report
+        if dataset is not None and memory_report:
+            caption = f"Memory: {memory_report['after'] / 1e6:.1f} MB"
+            if memory_report["before"] is not None:
+                caption += f" (was {memory_report['before'] / 1e6:.1f} MB before dtype normalization)"
+            st.sidebar.caption(caption)
+        
+        if dataset is not None and get_store().from_snapshot:
+            st.sidebar.caption("Showing the local snapshot while fresh data loads in the background.")
+        
+        if dataset is not None and get_store().last_error:
+            loaded_at = time.strftime("%H:%M", time.localtime(get_store().loaded_at))
+            st.sidebar.warning(f"Latest data refresh failed; showing data loaded at {loaded_at}.")
+        
+        pool = cfg.pool_stats()
+        if "checked_out" in pool:
+            with st.sidebar.expander("Database Pool"):
+                st.caption(
+                    f"Checked out: {pool['checked_out']} / {pool['pool_size']} "
+                    f"(+{pool['overflow']} overflow) · "
+                    f"Avg wait: {pool['avg_wait_ms']:.1f} ms · Max wait: {pool['max_wait_ms']:.1f} ms"
+                )
+        
+        cache_stats = get_figure_cache().stats()
+        with st.sidebar.expander("Figure Cache"):
+            st.caption(
+                f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} "
+                f"({cache_stats['hit_rate']:.0%} hit rate) · Entries: {cache_stats['entries']}"
+            )
+        
+        # Opt-in: filled at the end of the run, once every stage has been timed
+        show_perf = st.sidebar.checkbox("Show performance panel", value=False)
+        perf_panel = st.sidebar.container()
+        
+        # New rows are appended automatically; a full refetch is only done on request
+        if dataset is not None and st.sidebar.button("🔄 Full Reload", help="Fetch the whole dataset again"):
+            with st.spinner("Reloading all data..."):
+                get_store().full_reload()
+            st.rerun()
+        
         # Main title
         st.title("📊 Mental Health & Digital Usage Analytics")
         
@@ -515,43 +429,61 @@ def main():
         filter_col1, filter_col2, filter_col3 = st.columns([1, 1, 2])
         
         with filter_col1:
-            gender_options = ['All'] + list(df['gender'].unique())
+            gender_options = ['All'] + cube.dimension_values('gender')
             selected_gender = st.selectbox("Gender", gender_options)
         
         with filter_col2:
-            region_options = ['All'] + list(df['region'].unique())
+            region_options = ['All'] + cube.dimension_values('region')
             selected_region = st.selectbox("Region", region_options)
         
-        # Apply filters
-        filtered_df = df.copy()
-        if selected_gender != 'All':
-            filtered_df = filtered_df[filtered_df['gender'] == selected_gender]
-        if selected_region != 'All':
-            filtered_df = filtered_df[filtered_df['region'] == selected_region]
+        # Apply filters on the cube; row-level filtering is only done for pages that need rows
+        with timing.span("filter"):
+            filtered_cube = cube.filter(gender=selected_gender, region=selected_region)
+            filtered_count = filtered_cube.row_count
+        chart_state = ((selected_gender, selected_region), cube.version)
         
         with filter_col3:
-            st.metric("Filtered Records", len(filtered_df), delta=f"{len(filtered_df) - len(df)}")
+            st.metric("Filtered Records", filtered_count, delta=f"{filtered_count - total_records}")
         
         st.markdown("---")
         
+        # Every aggregation the page needs is computed together, once per distinct grouping
+        page_source = planner.PlannedSource(filtered_cube, page_requirements(page))
+        
         # Dashboard content based on selected page
         if page == "Dashboard":
             st.markdown("### 📈 Key Metrics")
             
             # Display statistics
+            total_stats = aggregation.total_stats(page_source)
+            totals = total_stats['mean']
+            approximate = sampling.is_approximate(total_stats)
+            
+            def metric_value(metric):
+                if approximate:
+                    return f"≈{totals[metric]:.2f}"
+                return f"{totals[metric]:.2f}"
+            
+            def metric_help(text, metric):
+                if approximate:
+                    low, high = total_stats.loc[metric, ['ci_low', 'ci_high']]
+                    return f"{text} (estimate, 95% CI {low:.2f}–{high:.2f})"
+                return text
+            
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Avg Stress Level", f"{filtered_df['stress_level'].mean():.2f}", 
-                         help="Average stress level from all respondents")
+                st.metric("Avg Stress Level", metric_value('stress_level'), 
+                         help=metric_help("Average stress level from all respondents", 'stress_level'))
             with col2:
-                st.metric("Avg Anxiety Score", f"{filtered_df['anxiety_score'].mean():.2f}",
-                         help="Average anxiety score from all respondents")
+                st.metric("Avg Anxiety Score", metric_value('anxiety_score'),
+                         help=metric_help("Average anxiety score from all respondents", 'anxiety_score'))
             with col3:
-                st.metric("Avg Device Hours", f"{filtered_df['device_hours_per_day'].mean():.2f}",
-                         help="Average daily device usage in hours")
+                st.metric("Avg Device Hours", metric_value('device_hours_per_day'),
+                         help=metric_help("Average daily device usage in hours", 'device_hours_per_day'))
             with col4:
-                st.metric("Avg Happiness", f"{filtered_df['happiness_score'].mean():.2f}",
-                         help="Average happiness score from all respondents")
+                st.metric("Avg Happiness", metric_value('happiness_score'),
+                         help=metric_help("Average happiness score from all respondents", 'happiness_score'))
+            show_status("key_metrics", approximate)
             
             st.markdown("---")
             st.markdown("### 📊 Overview Charts")
@@ -559,55 +491,181 @@ def main():
             # Key visualizations
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(plot_device_usage_vs_stress(filtered_df), use_container_width=True, config={'displayModeBar': False})
-                st.plotly_chart(plot_region_vs_happiness(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_device_usage_vs_stress, page_source, chart_state)
+                show_chart(plot_region_vs_happiness, page_source, chart_state)
             
             with col2:
-                st.plotly_chart(plot_sleep_vs_anxiety(filtered_df), use_container_width=True, config={'displayModeBar': False})
-                st.plotly_chart(plot_gender_vs_stress(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_sleep_vs_anxiety, page_source, chart_state)
+                show_chart(plot_gender_vs_stress, page_source, chart_state)
         
         elif page == "Device Usage":
             st.markdown("### 📱 Device Usage Analysis")
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(plot_device_usage_vs_stress(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_device_usage_vs_stress, page_source, chart_state)
             with col2:
-                st.plotly_chart(plot_device_type_vs_productivity(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_device_type_vs_productivity, page_source, chart_state)
         
         elif page == "Sleep & Mental Health":
             st.markdown("### 😴 Sleep & Mental Health Insights")
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(plot_sleep_vs_anxiety(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_sleep_vs_anxiety, page_source, chart_state)
             with col2:
-                st.plotly_chart(plot_income_vs_anxiety(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                # Box statistics are only requested when the figure is not cached yet
+                show_chart(plot_income_vs_anxiety, filtered_cube, chart_state)
         
         elif page == "Demographics":
             st.markdown("### 🎓 Demographic Insights")
             col1, col2 = st.columns(2)
             with col1:
-                st.plotly_chart(plot_region_vs_happiness(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_region_vs_happiness, page_source, chart_state)
             with col2:
-                st.plotly_chart(plot_gender_vs_stress(filtered_df), use_container_width=True, config={'displayModeBar': False})
+                show_chart(plot_gender_vs_stress, page_source, chart_state)
             
-            st.plotly_chart(plot_education_vs_dependence(filtered_df), use_container_width=True, config={'displayModeBar': False})
+            show_chart(plot_education_vs_dependence, page_source, chart_state)
         
         elif page == "Behavioral Patterns":
             st.markdown("### 📊 Behavioral Patterns")
-            st.plotly_chart(plot_phone_unlocks_vs_focus(filtered_df), use_container_width=True, config={'displayModeBar': False})
+            show_chart(plot_phone_unlocks_vs_focus, page_source, chart_state)
+        
+        elif page == "Trends":
+            st.markdown("### 📅 Trends Over Time")
+            ctrl1, ctrl2, ctrl3 = st.columns(3)
+            with ctrl1:
+                resolution = st.radio("Resolution", list(trends.RESOLUTIONS), horizontal=True)
+            with ctrl2:
+                unit = "day" if resolution == "Daily" else "week"
+                window = st.selectbox(
+                    "Rolling window", trends.ROLLING_WINDOWS[resolution],
+                    format_func=lambda w: "Off" if w == 1 else f"{w} {unit}s",
+                )
+            with ctrl3:
+                split_label = st.selectbox("Segment by", ["None", "Gender", "Region"])
+            split_by = None if split_label == "None" else split_label.lower()
+            
+            # Series are aggregated from running daily sums and downsampled before they are sent
+            trend_state = ((selected_gender, selected_region, resolution, window, split_by), cube.version)
+            col1, col2 = st.columns(2)
+            try:
+                for i, metric in enumerate(trends.TREND_METRICS):
+                    with col1 if i % 2 == 0 else col2:
+                        show_chart(
+                            functools.partial(
+                                plot_trend, metric=metric, resolution=resolution, window=window, split_by=split_by
+                            ),
+                            filtered_cube, trend_state, name=f"plot_trend.{metric}",
+                        )
+            except RuntimeError as e:
+                st.warning(f"Trends are not available: {e}")
+        
+        elif page == "Statistics":
+            st.markdown("### 🧮 Correlations & Significance")
+            segment_options = {
+                "None": (), "Gender": ("gender",), "Region": ("region",), "Gender × Region": ("gender", "region"),
+            }
+            ctrl1, ctrl2 = st.columns([1, 2])
+            with ctrl1:
+                segment_by = segment_options[st.selectbox("Segment by", list(segment_options), index=1)]
+            
+            # Every segment's matrix comes from one batched computation, cached per dataset version
+            try:
+                with timing.span("correlations"):
+                    results = filtered_cube.correlations(segment_by)
+            except RuntimeError as e:
+                st.warning(f"Statistics are not available: {e}")
+                results = {}
+            
+            if results:
+                with ctrl2:
+                    segments = st.multiselect("Segments", list(results), default=list(results)[:4])
+                
+                st.markdown("#### Report Claims")
+                claims = correlation.claims_table({label: results[label] for label in segments})
+                st.dataframe(
+                    claims.style.format({"r": "{:.3f}", "p_value": "{:.2g}", "n": "{:,}"}),
+                    use_container_width=True, hide_index=True
+                )
+                st.caption("Pearson r with two-sided t-test p-values; * p < 0.05, ** p < 0.01, *** p < 0.001.")
+                
+                stats_state = ((selected_gender, selected_region, segment_by), cube.version)
+                col1, col2 = st.columns(2)
+                for i, label in enumerate(segments):
+                    with col1 if i % 2 == 0 else col2:
+                        show_chart(
+                            functools.partial(plot_correlation_matrix, segment=label),
+                            results, stats_state, name=f"plot_correlation_matrix.{label}",
+                        )
         
         elif page == "Raw Data":
             st.markdown("### 📋 Raw Data")
-            st.dataframe(filtered_df, use_container_width=True)
+            rows = filter_rows(dataset, selected_gender, selected_region)
+            raw_columns = [c for c in rows.df.columns if c not in binning.BUCKETS]
+            version = dataset.version if dataset is not None else load_data().version
             
-            # Download button
-            csv = filtered_df.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name="mental_health_data.csv",
-                mime="text/csv"
-            )
+            # Server-side sorting and pagination: only one page is sent to the browser
+            ctrl1, ctrl2, ctrl3, ctrl4 = st.columns([2, 1, 1, 1])
+            with ctrl1:
+                sort_by = st.selectbox("Sort by", ["(none)"] + raw_columns)
+            with ctrl2:
+                ascending = st.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+            with ctrl3:
+                page_size = st.selectbox("Rows per page", [50, 100, 250, 500], index=1)
+            page_count = max(1, -(-len(rows) // page_size))
+            with ctrl4:
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            
+            with timing.span("raw_page"):
+                order = None
+                if sort_by != "(none)":
+                    order = load_sort_order(version, selected_gender, selected_region, sort_by, ascending, rows)
+                page_df = rawdata.page_frame(rows, int(page_number) - 1, page_size, raw_columns, order)
+            st.dataframe(page_df, use_container_width=True, hide_index=True)
+            st.caption(f"Page {int(page_number)} of {page_count} · {len(rows)} rows")
+            
+            # Exports are written chunk by chunk to a file, only when requested,
+            # and downloaded from Streamlit's static file server (read from disk)
+            exp1, exp2 = st.columns([1, 3])
+            with exp1:
+                export_format = st.selectbox("Export format", ["CSV", "Parquet"])
+            with exp2:
+                if st.button("Prepare Export"):
+                    previous = st.session_state.pop("export_path", None)
+                    if previous and os.path.exists(previous):
+                        os.remove(previous)
+                    with st.spinner("Writing export..."):
+                        st.session_state["export_path"] = rawdata.export_file(
+                            rows, export_format.lower(), raw_columns, order
+                        )
+                        st.session_state["export_format"] = export_format
+            
+            export_path = st.session_state.get("export_path")
+            if export_path and os.path.exists(export_path):
+                export_format = st.session_state["export_format"]
+                extension = export_format.lower()
+                if st.get_option("server.enableStaticServing"):
+                    st.markdown(
+                        f'<a href="app/static/exports/{os.path.basename(export_path)}" '
+                        f'download="mental_health_data.{extension}">⬇️ Download {export_format}</a>',
+                        unsafe_allow_html=True
+                    )
+                    st.caption(f"The export link expires after {rawdata.EXPORT_MAX_AGE // 60} minutes.")
+                else:
+                    # Without static serving the file goes through Streamlit's in-memory media store
+                    with open(export_path, "rb") as export_file:
+                        st.download_button(
+                            label=f"Download {export_format}",
+                            data=export_file,
+                            file_name=f"mental_health_data.{extension}",
+                            mime="text/csv" if extension == "csv" else "application/octet-stream"
+                        )
+        
+        if show_perf:
+            show_perf_panel(perf_panel, trace)
+        
+        # Swap in the exact charts once the background computation has finished
+        if st.session_state["approximate_charts"]:
+            refine_charts(cube)
             
     else:
         st.error("❌ Failed to load data. Please check your Supabase connection or CSV file.")
@@ -0,0 +1,53 @@
+import threading
+
+import aggregation
+import timing
+
+
+def plan(requirements):
+    """
+    Group (by, metric) pairs into one aggregation per distinct grouping:
+    [("region", "happiness_score"), ("region", "stress_level")] -> {"region": ["happiness_score", "stress_level"]}
+    """
+    passes = {}
+    for by, metric in requirements:
+        metrics = passes.setdefault(by, [])
+        if metric not in metrics:
+            metrics.append(metric)
+    return passes
+
+
+class PlannedSource:
+    """
+    Aggregate source for one page render. On first use it computes every
+    (by, metric) pair the page needs with one pass per distinct grouping,
+    then serves the precomputed stats to the chart builders. Pairs that were
+    not planned fall back to the underlying source.
+    """
+
+    def __init__(self, source, requirements):
+        self.source = source
+        self.requirements = list(requirements)
+        self._results = None
+        self._lock = threading.Lock()
+
+    def _execute(self):
+        with self._lock:
+            if self._results is None:
+                results = {}
+                for by, metrics in plan(self.requirements).items():
+                    with timing.span("aggregate", by=by):
+                        stats = aggregation.group_stats_many(self.source, by, metrics)
+                    for metric in metrics:
+                        results[(by, metric)] = stats[metric]
+                self._results = results
+        return self._results
+
+    def stats(self, by, metric):
+        results = self._execute()
+        if (by, metric) in results:
+            return results[(by, metric)]
+        return aggregation.group_stats(self.source, by, metric)
+
+    def totals(self):
+        return aggregation.total_stats(self.source)
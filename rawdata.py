@@ -0,0 +1,131 @@
+import os
+import secrets
+import time
+
+import numpy as np
+import pandas as pd
+
+# Rows written per chunk when exporting
+EXPORT_CHUNK_ROWS = 100_000
+# Export files are written to the app's static folder and served from disk by Streamlit
+# (server.enableStaticServing), so a download never loads the file into memory
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "exports")
+# Exports older than this many seconds are deleted, and the oldest ones beyond the size limit
+EXPORT_MAX_AGE = 3600
+EXPORT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def sort_order(view, column, ascending=True):
+    """
+    Positions (relative to the view) of the selected rows sorted by `column`.
+    Categoricals are sorted by label; missing values always come last.
+    """
+    series = view.df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Rank of every category by label, looked up through the codes
+        label_rank = np.argsort(np.argsort(np.asarray(series.cat.categories, dtype=str)))
+        codes = series.cat.codes.to_numpy()
+        keys = np.where(codes >= 0, label_rank[codes], np.nan).astype("float64")
+    elif series.dtype.kind == "M":
+        nat = series.isna().to_numpy()
+        keys = np.where(nat, np.nan, series.to_numpy("datetime64[ns]").view("int64").astype("float64"))
+    else:
+        keys = series.to_numpy(dtype="float64", na_value=np.nan)
+    if view.positions is not None:
+        keys = keys[view.positions]
+
+    missing = np.isnan(keys)
+    if not ascending:
+        keys = -keys
+    order = np.argsort(keys, kind="stable")
+    # NaN sorts last for ascending; keep it last for descending too
+    return np.concatenate([order[~missing[order]], order[missing[order]]])
+
+
+def page_frame(view, page, page_size, columns=None, order=None):
+    """One page of rows (0-based `page`), optionally in a precomputed sort `order`"""
+    start = page * page_size
+    stop = min(start + page_size, len(view))
+    if order is None:
+        return view.frame(columns, start, stop)
+    return view.take(order[start:stop], columns)
+
+
+def _chunks(view, columns, order, chunk_rows):
+    for start in range(0, len(view), chunk_rows):
+        stop = min(start + chunk_rows, len(view))
+        if order is None:
+            yield view.frame(columns, start, stop)
+        else:
+            yield view.take(order[start:stop], columns)
+
+
+def iter_csv(view, columns=None, order=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the selected rows as CSV text, one chunk of `chunk_rows` rows at a time"""
+    header = True
+    for chunk in _chunks(view, columns, order, chunk_rows):
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+
+
+def cleanup_exports(directory=EXPORT_DIR, max_age=EXPORT_MAX_AGE, max_bytes=EXPORT_MAX_BYTES):
+    """
+    Delete export files older than `max_age` seconds, then the oldest ones
+    until the rest fit in `max_bytes`. Covers exports of ended sessions and
+    of earlier processes. Returns the number of deleted files.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    files = []
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    now = time.time()
+    total = sum(size for _, size, _ in files)
+    deleted = 0
+    for mtime, size, path in files:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError:
+            pass
+        total -= size
+    return deleted
+
+
+def export_file(view, fmt="csv", columns=None, order=None, chunk_rows=EXPORT_CHUNK_ROWS, directory=EXPORT_DIR):
+    """
+    Write the selected rows to a CSV or Parquet file in `directory` chunk by
+    chunk, so memory stays bounded by one chunk. The file name is random, as
+    the file is served by URL. Returns the file path.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    cleanup_exports(directory)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"mental_health_data_{secrets.token_hex(16)}.{fmt}")
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for text in iter_csv(view, columns, order, chunk_rows):
+                f.write(text)
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in _chunks(view, columns, order, chunk_rows):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            if writer is None:
+                empty = view.frame(columns, 0, 0)
+                pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path)
+        finally:
+            if writer is not None:
+                writer.close()
+    return path
@@ -0,0 +1,227 @@
+"""
+Stratified row sample for the approximate mode.
+
+Rows are sampled independently per gender x region stratum (proportional
+allocation with a minimum per stratum), so every filter selection of the
+dashboard keeps enough sampled rows. Means are estimated with the stratum
+weights N_h / n_h and come with a 95% confidence interval from the
+stratified variance estimator (linearized for the ratio of weighted sums).
+"""
+import numpy as np
+import pandas as pd
+
+from aggregation import DIMENSIONS, METRICS
+
+# Sampling strata; the same dimensions the dashboard filters by
+STRATA = ["gender", "region"]
+# Sampled rows per stratum at least (whole stratum when it is smaller)
+MIN_PER_STRATUM = 500
+# Normal quantile of the 95% confidence intervals
+Z_95 = 1.959963984540054
+
+
+def stratum_codes(df):
+    """Integer stratum code per row and a table of the strata (one row per code)"""
+    codes, uniques = [], []
+    for name in STRATA:
+        column = df[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            code, values = column.cat.codes.to_numpy().astype("int64"), column.cat.categories
+        else:
+            code, values = pd.factorize(column)
+        codes.append(code)
+        uniques.append(values)
+    combined = np.zeros(len(df), dtype="int64")
+    valid = np.ones(len(df), dtype=bool)
+    for code, values in zip(codes, uniques):
+        valid &= code >= 0
+        combined = combined * len(values) + code
+    strata = pd.MultiIndex.from_product(uniques, names=STRATA).to_frame(index=False)
+    return np.where(valid, combined, -1), strata
+
+
+class SampleCube:
+    """
+    Estimated statistics from a stratified sample, with the interface of
+    aggregation.AggregateCube. Stats frames have count / mean / std plus
+    ci_low / ci_high (95% confidence interval of the mean); the ci columns
+    are what marks a result as approximate. Row counts are exact, because
+    filters only select whole strata. The sampled rows are kept for box
+    statistics (weighted quartiles).
+    """
+
+    def __init__(self, table, strata, version=None, rows=None):
+        self.table = table    # per dimension combination and stratum: <metric>_sum / _sumsq / _count
+        self.strata = strata  # per stratum: dimension values, population rows N, sampled rows n
+        self.version = version
+        self.rows = rows      # sampled rows: dimensions, metrics and stratum code
+
+    @classmethod
+    def from_frame(cls, df, size, seed=0, min_per_stratum=MIN_PER_STRATUM, version=None):
+        """Draw about `size` rows of `df` (with bucket columns) and aggregate them per stratum"""
+        codes, strata = stratum_codes(df)
+        population = np.bincount(codes[codes >= 0], minlength=len(strata))
+        share = population / max(population.sum(), 1)
+        target = np.minimum(np.maximum(np.round(size * share), min_per_stratum), population)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            probability = np.where(population > 0, target / population, 0.0)
+
+        # One uniform draw per row instead of a sort per stratum
+        rng = np.random.default_rng(seed)
+        keep = codes >= 0
+        keep[keep] = rng.random(int(keep.sum())) < probability[codes[keep]]
+        positions = np.flatnonzero(keep)
+
+        dims = [d for d in DIMENSIONS if d in df.columns]
+        metrics = [m for m in METRICS if m in df.columns]
+        sample = df.iloc[positions]
+        values = sample[metrics].astype("float64")
+        parts = pd.concat(
+            [
+                values.add_suffix("_sum"),
+                (values * values).add_suffix("_sumsq"),
+                values.notna().astype("int64").add_suffix("_count"),
+            ],
+            axis=1,
+        )
+        parts["stratum"] = codes[positions]
+        keys = [sample[d] for d in dims] + [parts["stratum"]]
+        table = parts.drop(columns="stratum").groupby(keys, observed=True, dropna=False, sort=False).sum()
+        rows = sample[dims + metrics].reset_index(drop=True)
+        rows["stratum"] = codes[positions]
+
+        strata["N"] = population
+        strata["n"] = np.bincount(codes[positions], minlength=len(strata))
+        strata = strata[strata["N"] > 0]
+        return cls(table.reset_index(), strata, version, rows)
+
+    @property
+    def row_count(self):
+        return int(self.strata["N"].sum())
+
+    def filter(self, **selections):
+        mask, strata_mask, rows_mask = None, None, None
+        for dim, value in selections.items():
+            if value is None or value == "All":
+                continue
+            current = self.table[dim] == value
+            mask = current if mask is None else mask & current
+            if dim in STRATA:
+                current = self.strata[dim] == value
+                strata_mask = current if strata_mask is None else strata_mask & current
+            if self.rows is not None:
+                current = self.rows[dim] == value
+                rows_mask = current if rows_mask is None else rows_mask & current
+        if mask is None:
+            return self
+        strata = self.strata if strata_mask is None else self.strata[strata_mask]
+        rows = self.rows if rows_mask is None else self.rows[rows_mask]
+        return SampleCube(self.table[mask], strata, self.version, rows)
+
+    def dimension_values(self, name):
+        if name in STRATA:
+            return list(self.strata[name].unique())
+        return list(self.table[name].dropna().unique())
+
+    def _estimate(self, keys, metric):
+        """Stratified estimates of `metric` per value of `keys` (a column of self.table or a constant)"""
+        columns = [f"{metric}_sum", f"{metric}_sumsq", f"{metric}_count"]
+        per_stratum = self.table.groupby([keys, self.table["stratum"]], observed=True)[columns].sum()
+        total, sumsq, count = (per_stratum[c] for c in columns)
+        strata = self.strata.loc[self.strata.index.intersection(per_stratum.index.unique(level=1))]
+        population = strata["N"].astype("float64").reindex(per_stratum.index, level=1)
+        sampled = strata["n"].astype("float64").reindex(per_stratum.index, level=1)
+        weight = population / sampled
+
+        group = per_stratum.index.get_level_values(0)
+        estimated_count = (weight * count).groupby(group).sum()
+        mean = (weight * total).groupby(group).sum() / estimated_count
+        second_moment = (weight * sumsq).groupby(group).sum() / estimated_count
+
+        # Linearized residuals z = y - mean (zero for rows outside the group), summed per stratum
+        group_mean = mean.reindex(group).to_numpy()
+        z_sum = total - group_mean * count
+        z_sumsq = sumsq - 2 * group_mean * total + group_mean * group_mean * count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_var = ((z_sumsq - z_sum * z_sum / sampled) / (sampled - 1)).where(sampled > 1, 0.0).clip(lower=0)
+            variance = (population * population * (1 - sampled / population) * z_var / sampled).groupby(group).sum()
+            se = np.sqrt(variance) / estimated_count
+            std = np.sqrt(
+                ((second_moment - mean * mean) * estimated_count / (estimated_count - 1)).clip(lower=0)
+            ).where(estimated_count > 1)
+        return pd.DataFrame({
+            "count": estimated_count.round(),
+            "mean": mean,
+            "std": std,
+            "ci_low": mean - Z_95 * se,
+            "ci_high": mean + Z_95 * se,
+        })
+
+    def stats(self, by, metric):
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        results = {}
+        for metric in metrics:
+            result = self._estimate(self.table[by], metric)
+            result.index.name = by
+            results[metric] = result
+        return results
+
+    def totals(self):
+        metrics = [m for m in METRICS if f"{m}_sum" in self.table.columns]
+        everything = pd.Series("all", index=self.table.index)
+        rows = [self._estimate(everything, metric).iloc[0].rename(metric) for metric in metrics]
+        return pd.DataFrame(rows)
+
+
+    def box_stats(self, by, metric):
+        """
+        Box statistics per value of `by`: quartiles and whiskers from the
+        sampled rows weighted by N_h / n_h, count / mean / sd with confidence
+        intervals from the stratified estimator.
+        """
+        if self.rows is None:
+            raise ValueError("SampleCube was built without its sampled rows")
+        strata = self.strata
+        weights = (strata["N"] / strata["n"]).reindex(self.rows["stratum"]).to_numpy("float64")
+        values = self.rows[metric].to_numpy("float64")
+        valid = ~np.isnan(values)
+        groups = self.rows[by].to_numpy()
+
+        estimates = self._estimate(self.table[by], metric)
+        records = {}
+        for group in estimates.index:
+            selected = valid & (groups == group)
+            if not selected.any():
+                continue
+            group_values, group_weights = values[selected], weights[selected]
+            order = np.argsort(group_values, kind="stable")
+            group_values, group_weights = group_values[order], group_weights[order]
+            # Weighted quantiles: interpolate between the midpoints of each value's weight
+            centers = (np.cumsum(group_weights) - group_weights / 2) / group_weights.sum()
+            q1, median, q3 = np.interp([0.25, 0.5, 0.75], centers, group_values)
+            iqr = q3 - q1
+            inside = group_values[(group_values >= q1 - 1.5 * iqr) & (group_values <= q3 + 1.5 * iqr)]
+            estimate = estimates.loc[group]
+            records[group] = {
+                "count": estimate["count"],
+                "q1": q1,
+                "median": median,
+                "q3": q3,
+                "lowerfence": inside.min(),
+                "upperfence": inside.max(),
+                "mean": estimate["mean"],
+                "sd": estimate["std"],
+                "approximate": True,
+                "ci_low": estimate["ci_low"],
+                "ci_high": estimate["ci_high"],
+            }
+        result = pd.DataFrame.from_dict(records, orient="index")
+        result.index.name = by
+        return result
+
+
+def is_approximate(stats):
+    """True for a stats frame estimated from a sample (it carries confidence intervals)"""
+    return "ci_low" in stats.columns
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ["gender", "region", "education_level", "income_level", "device_type"]
+
+# Numeric columns that are downcast: integer-valued columns without missing
+# values go to the smallest integer type, everything else to float32
+NUMERIC_COLUMNS = [
+    "stress_level",
+    "anxiety_score",
+    "happiness_score",
+    "sleep_duration",
+    "focus_score",
+    "digital_dependence_score",
+    "productivity_score",
+    "device_hours_per_day",
+    "phone_unlocks",
+]
+
+# Calendar date columns, stored as datetime64 (day resolution)
+DATE_COLUMNS = ["date"]
+
+
+def memory_usage(df):
+    """Deep memory usage of a DataFrame in bytes"""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _downcast(series):
+    values = pd.to_numeric(series, errors="coerce")
+    if values.isna().any():
+        return values.astype("float32")
+    as_float = values.to_numpy(dtype="float64")
+    if np.array_equal(as_float, np.round(as_float)):
+        return pd.to_numeric(values.astype("int64"), downcast="integer")
+    return values.astype("float32")
+
+
+def normalize_dtypes(df):
+    """
+    Convert the dimensions to categoricals, downcast the numeric columns and parse the dates.
+    Returns (df, report) where report holds the memory usage before and after in bytes.
+    """
+    before = memory_usage(df)
+    columns = {}
+    for name in CATEGORICAL_COLUMNS:
+        if name in df.columns and not isinstance(df[name].dtype, pd.CategoricalDtype):
+            columns[name] = df[name].astype("category")
+    for name in NUMERIC_COLUMNS:
+        if name in df.columns:
+            columns[name] = _downcast(df[name])
+    for name in DATE_COLUMNS:
+        if name in df.columns:
+            columns[name] = pd.to_datetime(df[name], errors="coerce").dt.normalize().astype("datetime64[ns]")
+    df = df.assign(**columns)
+    after = memory_usage(df)
+    return df, {"before": before, "after": after}
+
+
+def _concat_column(parts):
+    first = parts[0]
+    if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+        if all(p.cat.categories.equals(first.cat.categories) for p in parts[1:]):
+            return pd.Categorical.from_codes(
+                np.concatenate([p.cat.codes.to_numpy() for p in parts]), dtype=first.dtype
+            )
+        # pd.concat falls back to object when the categories differ
+        combined = union_categoricals(
+            [p.array for p in parts], sort_categories=not first.cat.ordered, ignore_order=not first.cat.ordered
+        )
+        return pd.Categorical(combined, ordered=first.cat.ordered)
+    dtypes = {p.dtype for p in parts}
+    if len(dtypes) > 1 and any(getattr(d, "kind", "O") == "f" for d in dtypes) \
+            and all(getattr(d, "kind", "O") in "iuf" for d in dtypes):
+        # e.g. int8 vs float32 after a delta with missing values; stay in float32
+        return np.concatenate([p.to_numpy("float32", na_value=np.nan) for p in parts])
+    return pd.concat(parts, ignore_index=True)
+
+
+def concat_frames(*frames):
+    """
+    Concatenate frames column by column, keeping categorical columns categorical
+    (pd.concat falls back to object when the categories differ). Columns missing
+    from any frame are dropped.
+    """
+    frames = [f for f in frames if f is not None]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    names = [name for name in frames[0].columns if all(name in f.columns for f in frames[1:])]
+    columns = {name: _concat_column([f[name] for f in frames]) for name in names}
+    return pd.DataFrame(columns, columns=names)
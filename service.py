@@ -0,0 +1,274 @@
+"""
+Local HTTP/JSON API and CLI for the analytics engine (see engine.py).
+
+    python service.py serve --port 8765
+    python service.py stats --by region --metrics happiness_score --gender Female
+    python service.py totals --url http://127.0.0.1:8765
+
+Dashboard replicas started with ANALYTICS_SERVICE_URL pointing at the server
+read every chart aggregation from it through RemoteSource.
+"""
+import argparse
+import json
+import sys
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import timing
+
+DEFAULT_PORT = 8765
+# Seconds a dashboard waits for the service before giving up on a request
+REQUEST_TIMEOUT = 60
+
+
+def frame_to_json(df):
+    """JSON-safe dict of a result DataFrame (missing values become null, dates ISO strings)"""
+    dates = isinstance(df.index, pd.DatetimeIndex)
+    return {
+        "index_name": df.index.name,
+        "index": df.index.strftime("%Y-%m-%d").tolist() if dates else df.index.tolist(),
+        "index_dates": dates,
+        "columns": {
+            column: df[column].astype(object).where(df[column].notna(), None).tolist()
+            for column in df.columns
+        },
+    }
+
+
+def frame_from_json(payload):
+    if payload.get("index_dates"):
+        index = pd.DatetimeIndex(payload["index"], name=payload["index_name"])
+    else:
+        index = pd.Index(payload["index"], name=payload["index_name"])
+    return pd.DataFrame(payload["columns"], index=index).infer_objects()
+
+
+def correlations_to_json(results):
+    return {
+        label: {"n": result["n"], "r": frame_to_json(result["r"]), "p": frame_to_json(result["p"])}
+        for label, result in results.items()
+    }
+
+
+def correlations_from_json(payload):
+    return {
+        label: {"n": result["n"], "r": frame_from_json(result["r"]), "p": frame_from_json(result["p"])}
+        for label, result in payload.items()
+    }
+
+
+class EngineHandler(BaseHTTPRequestHandler):
+    """Request handler; the engine is attached to the server as `server.engine`"""
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, route, payload):
+        engine = self.server.engine
+        filters = payload.get("filters") or {}
+        if route == "/health":
+            return {"status": "ok", "refining": engine.refining}
+        if route == "/meta":
+            return engine.meta()
+        if route == "/metrics":
+            return {"cache": engine.cache.stats(), "stages": timing.TIMINGS.summary()}
+        if route == "/stats":
+            stats = engine.stats_many(payload["by"], payload["metrics"], filters)
+            return {"version": engine.version, "stats": {m: frame_to_json(df) for m, df in stats.items()}}
+        if route == "/totals":
+            return {"version": engine.version, "totals": frame_to_json(engine.totals(filters))}
+        if route == "/row_count":
+            return {"version": engine.version, "row_count": engine.row_count(filters)}
+        if route == "/box_stats":
+            stats = engine.box_stats(payload["by"], payload["metric"], filters)
+            return {"version": engine.version, "box_stats": frame_to_json(stats)}
+        if route == "/correlations":
+            results = engine.correlations(payload.get("by") or (), filters)
+            return {"version": engine.version, "correlations": correlations_to_json(results)}
+        if route == "/trend":
+            trend = engine.trend(
+                payload["metric"], payload.get("resolution", "Daily"), int(payload.get("window", 1)),
+                payload.get("split_by"), filters,
+            )
+            return {"version": engine.version, "trend": frame_to_json(trend)}
+        return None
+
+    def _dispatch(self, payload):
+        route = self.path.split("?", 1)[0]
+        try:
+            with timing.span(f"service{route}"):
+                body = self._handle(route, payload)
+        except (KeyError, ValueError, TypeError) as e:
+            return self._send(400, {"error": f"Bad request: {e}"})
+        except RuntimeError as e:
+            return self._send(503, {"error": str(e)})
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+        if body is None:
+            return self._send(404, {"error": f"Unknown route: {route}"})
+        self._send(200, body)
+
+    def do_GET(self):
+        self._dispatch({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            return self._send(400, {"error": f"Invalid JSON: {e}"})
+        self._dispatch(payload)
+
+    def log_message(self, format, *args):
+        pass  # request timings are recorded as spans instead
+
+
+def make_server(engine, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), EngineHandler)
+    server.daemon_threads = True
+    server.engine = engine
+    return server
+
+
+class RemoteSource:
+    """
+    Aggregate source backed by the analytics service. Same interface as
+    aggregation.AggregateCube (filter / stats / stats_many / totals /
+    row_count / dimension_values / version), plus box_stats() for the box plot,
+    trend() for the Trends page and correlations() for the Statistics page.
+    """
+
+    def __init__(self, url, filters=None, meta=None):
+        self.url = url.rstrip("/")
+        self.filters = dict(filters or {})
+        self.meta = meta if meta is not None else self._request("/meta")
+        self.version = self.meta["version"]
+
+    def _request(self, route, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(
+            self.url + route, data=data, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode(errors="replace")
+            raise RuntimeError(f"Analytics service error {e.code} on {route}: {detail}") from None
+
+    def filter(self, **selections):
+        filters = dict(self.filters)
+        filters.update(selections)
+        return RemoteSource(self.url, filters, self.meta)
+
+    def stats(self, by, metric):
+        return self.stats_many(by, [metric])[metric]
+
+    def stats_many(self, by, metrics):
+        body = self._request("/stats", {"by": by, "metrics": list(metrics), "filters": self.filters})
+        return {metric: frame_from_json(payload) for metric, payload in body["stats"].items()}
+
+    def totals(self):
+        return frame_from_json(self._request("/totals", {"filters": self.filters})["totals"])
+
+    def refining(self):
+        """True while the service computes exact results in the background"""
+        return self._request("/health")["refining"]
+
+    def box_stats(self, by, metric):
+        body = self._request("/box_stats", {"by": by, "metric": metric, "filters": self.filters})
+        return frame_from_json(body["box_stats"])
+
+    def correlations(self, by=()):
+        body = self._request("/correlations", {"by": list(by), "filters": self.filters})
+        return correlations_from_json(body["correlations"])
+
+    def trend(self, metric, resolution="Daily", window=1, split_by=None):
+        body = self._request("/trend", {
+            "metric": metric, "resolution": resolution, "window": int(window),
+            "split_by": split_by, "filters": self.filters,
+        })
+        return frame_from_json(body["trend"])
+
+    @property
+    def row_count(self):
+        if not any(v not in (None, "All") for v in self.filters.values()):
+            return self.meta["row_count"]
+        return self._request("/row_count", {"filters": self.filters})["row_count"]
+
+    def dimension_values(self, name):
+        return list(self.meta["dimensions"][name])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analytics engine service and CLI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the HTTP/JSON API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    for name in ("meta", "stats", "totals", "box_stats", "trend", "correlations"):
+        command = commands.add_parser(name, help=f"print {name} as JSON")
+        command.add_argument("--url", help="query a running service instead of computing in-process")
+        command.add_argument("--gender", default="All")
+        command.add_argument("--region", default="All")
+        if name in ("stats", "box_stats"):
+            command.add_argument("--by", required=True)
+        if name == "stats":
+            command.add_argument("--metrics", nargs="+", required=True)
+        if name in ("box_stats", "trend"):
+            command.add_argument("--metric", required=True)
+        if name == "correlations":
+            command.add_argument("--by", nargs="*", default=[], choices=["gender", "region"])
+        if name == "trend":
+            command.add_argument("--resolution", default="Daily", choices=["Daily", "Weekly"])
+            command.add_argument("--window", type=int, default=1)
+            command.add_argument("--split-by", choices=["gender", "region"])
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import engine
+        server = make_server(engine.AnalyticsEngine(), args.host, args.port)
+        print(f"Analytics service listening on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    if args.url:
+        source = RemoteSource(args.url)
+    else:
+        import engine
+        source = engine.EngineSource(engine.AnalyticsEngine())
+    source = source.filter(gender=args.gender, region=args.region)
+
+    if args.command == "meta":
+        result = source.meta
+    elif args.command == "stats":
+        result = {m: frame_to_json(df) for m, df in source.stats_many(args.by, args.metrics).items()}
+    elif args.command == "totals":
+        result = frame_to_json(source.totals())
+    elif args.command == "correlations":
+        result = correlations_to_json(source.correlations(args.by))
+    elif args.command == "trend":
+        result = frame_to_json(source.trend(args.metric, args.resolution, args.window, args.split_by))
+    else:
+        result = frame_to_json(source.box_stats(args.by, args.metric))
+    json.dump(result, sys.stdout, indent=2, default=str)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import datetime
+import json
+import os
+
+import config as cfg
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_FORMAT = 1
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(".cache", "mental_health_data.arrow"))
+
+
+def _encode_watermark(watermark):
+    if not watermark:
+        return None
+    # Drivers without a date type (e.g. SQLite) return ISO strings already
+    return {table: value.isoformat() if hasattr(value, "isoformat") else value for table, value in watermark.items()}
+
+
+def _decode_watermark(watermark):
+    if not watermark:
+        return None
+    decoded = {}
+    for table, value in watermark.items():
+        if value is None:
+            decoded[table] = None
+        elif len(value) == 10:
+            decoded[table] = datetime.date.fromisoformat(value)
+        else:
+            decoded[table] = datetime.datetime.fromisoformat(value)
+    return decoded
+
+
+def save_snapshot(df, version, watermark=None, path=SNAPSHOT_PATH):
+    """
+    Write the dataset as an Arrow IPC file with a header (schema metadata)
+    holding the snapshot format, dataset version and watermark.
+    The file is written to a temporary path and renamed, so readers never see a partial file.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("pyarrow package not installed, skipping snapshot")
+        return False
+
+    try:
+        header = {
+            "format": SNAPSHOT_FORMAT,
+            "version": version,
+            "watermark": _encode_watermark(watermark),
+            "columns": list(cfg.COLUMN_SQL),
+        }
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), b"snapshot": json.dumps(header).encode()}
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Error writing snapshot: {e}")
+        return False
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """
+    Read a snapshot written by save_snapshot(). The file is memory-mapped, which only
+    speeds up reading: the returned frame is a regular in-memory copy.
+    Returns (df, version, watermark), or None when the file is missing,
+    unreadable or written with another format / column set.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            header = json.loads((table.schema.metadata or {}).get(b"snapshot", b"{}"))
+            if header.get("format") != SNAPSHOT_FORMAT or header.get("columns") != list(cfg.COLUMN_SQL):
+                print("Snapshot format or columns changed, ignoring it")
+                return None
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+        return df, header["version"], _decode_watermark(header.get("watermark"))
+    except Exception as e:
+        print(f"Error reading snapshot: {e}")
+        return None
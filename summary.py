@@ -0,0 +1,166 @@
+"""
+Materialized summary table of the dashboard aggregates.
+
+    python summary.py refresh          # incremental: recompute from the last summarized date
+    python summary.py refresh --full   # rebuild everything
+    python summary.py status
+
+dashboard_summary holds sum / sum-of-squares / count of every metric per date
+and combination of dashboard dimensions (buckets included); the date key is
+what makes incremental refreshes possible. dashboard_cube is the same table
+collapsed over dates and is what the dashboard reads, so its cost depends on
+the number of dimension combinations, not on the number of raw rows or days.
+"""
+import argparse
+
+import pandas as pd
+
+import aggregation
+import config as cfg
+import trends
+from aggregation import DIMENSIONS, METRICS
+
+SUMMARY_TABLE = "dashboard_summary"
+CUBE_TABLE = "dashboard_cube"
+
+_PARTS = ("sum", "sumsq", "count")
+
+
+def _metric_columns():
+    return [f"{metric}_{part}" for metric in METRICS for part in _PARTS]
+
+
+def create_table_sql():
+    columns = (
+        [f"{dim} TEXT" for dim in DIMENSIONS]
+        + ["row_count BIGINT"]
+        + [f"{column} DOUBLE PRECISION" for column in _metric_columns()]
+    )
+    return [
+        f"CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (date DATE, {', '.join(columns)})",
+        f"CREATE INDEX IF NOT EXISTS ix_{SUMMARY_TABLE}_date ON {SUMMARY_TABLE} (date)",
+        f"CREATE TABLE IF NOT EXISTS {CUBE_TABLE} ({', '.join(columns)})",
+    ]
+
+
+def build_refresh_sql(since=None):
+    """INSERT ... SELECT aggregating the raw join per date and dimensions (from `since` on, if given)"""
+    selects = ["wa.date"] + [f"{cfg._group_sql(dim)}" for dim in DIMENSIONS] + ["COUNT(*)"]
+    for metric in METRICS:
+        column = cfg.COLUMN_SQL[metric]
+        selects += [f"SUM({column})", f"SUM({column} * {column})", f"COUNT({column})"]
+    where = "WHERE wa.date >= :since" if since is not None else ""
+    group_by = ", ".join(str(i) for i in range(1, len(DIMENSIONS) + 2))
+    target = ["date", *DIMENSIONS, "row_count", *_metric_columns()]
+    return f"""
+            INSERT INTO {SUMMARY_TABLE} ({', '.join(target)})
+            SELECT {', '.join(selects)}
+            {cfg.JOIN_SQL}
+            {where}
+            GROUP BY {group_by}
+    """
+
+
+def build_cube_sql():
+    """INSERT ... SELECT collapsing the daily summary over dates"""
+    sums = [f"SUM({column})" for column in ["row_count", *_metric_columns()]]
+    return f"""
+            INSERT INTO {CUBE_TABLE} ({', '.join(DIMENSIONS)}, row_count, {', '.join(_metric_columns())})
+            SELECT {', '.join(DIMENSIONS)}, {', '.join(sums)}
+            FROM {SUMMARY_TABLE}
+            GROUP BY {', '.join(DIMENSIONS)}
+    """
+
+
+def refresh(full=False):
+    """
+    Bring the summary table up to date in one transaction. Incremental refreshes
+    recompute every date from the last summarized one (which may have been
+    partial); rows backfilled for older dates need a full refresh.
+    Returns {"since": date or None, "groups": inserted rows}, or None without a database.
+    """
+    from sqlalchemy import text
+    if cfg.get_engine() is None:
+        return None
+    with cfg.db_connection() as conn:
+        with conn.begin():
+            for sql in create_table_sql():
+                conn.execute(text(sql))
+            since = None if full else conn.execute(text(f"SELECT MAX(date) FROM {SUMMARY_TABLE}")).scalar()
+            if since is None:
+                conn.execute(text(f"DELETE FROM {SUMMARY_TABLE}"))
+                result = conn.execute(text(build_refresh_sql()))
+            else:
+                conn.execute(text(f"DELETE FROM {SUMMARY_TABLE} WHERE date >= :since"), {"since": since})
+                result = conn.execute(text(build_refresh_sql(since)), {"since": since})
+            conn.execute(text(f"DELETE FROM {CUBE_TABLE}"))
+            conn.execute(text(build_cube_sql()))
+    return {"since": since, "groups": result.rowcount}
+
+
+def summary_exists():
+    """True when the summary tables exist and have been filled"""
+    try:
+        from sqlalchemy import inspect, text
+        engine = cfg.get_engine()
+        if engine is None or not inspect(engine).has_table(CUBE_TABLE):
+            return False
+        with cfg.db_connection() as conn:
+            return conn.execute(text(f"SELECT 1 FROM {CUBE_TABLE} LIMIT 1")).first() is not None
+    except Exception as e:
+        print(f"Error checking summary table: {e}")
+        return False
+
+
+def load_summary_cube():
+    """
+    Read the date-collapsed summary as (AggregateCube, version). The version
+    is a content hash, so it only changes when a refresh changed the data.
+    """
+    from sqlalchemy import text
+    with cfg.db_connection() as conn:
+        table = pd.read_sql_query(text(f"SELECT * FROM {CUBE_TABLE}"), conn)
+    table = table.rename(columns={"row_count": "rows"})
+    table[_metric_columns() + ["rows"]] = table[_metric_columns() + ["rows"]].astype("float64")
+    version = "summary-" + str(pd.util.hash_pandas_object(table, index=False).sum())
+    return aggregation.AggregateCube(table), version
+
+
+def load_daily_trends():
+    """DailyAggregates of the trend metrics (see trends.py) read from the daily summary table"""
+    from sqlalchemy import text
+    keys = ["date", *trends.SEGMENT_DIMENSIONS]
+    sums = [
+        f"SUM({metric}_{part}) AS {metric}_{part}" for metric in trends.TREND_METRICS for part in ("sum", "count")
+    ]
+    sql = f"SELECT {', '.join(keys + sums)} FROM {SUMMARY_TABLE} GROUP BY {', '.join(keys)}"
+    with cfg.db_connection() as conn:
+        table = pd.read_sql_query(text(sql), conn)
+    return trends.DailyAggregates.from_sums(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the dashboard summary table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = commands.add_parser("refresh", help="refresh the summary table")
+    refresh_parser.add_argument("--full", action="store_true", help="rebuild instead of refreshing incrementally")
+    commands.add_parser("status", help="show whether the summary table is in use")
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        result = refresh(full=args.full)
+        if result is None:
+            print("DATABASE_URL not set; nothing to refresh.")
+        elif result["since"] is None:
+            print(f"Rebuilt {SUMMARY_TABLE}: {result['groups']} groups")
+        else:
+            print(f"Refreshed {SUMMARY_TABLE} from {result['since']}: {result['groups']} groups")
+    elif summary_exists():
+        cube, version = load_summary_cube()
+        print(f"{CUBE_TABLE}: {len(cube.table)} groups, {cube.row_count} rows, version {version}")
+    else:
+        print(f"{CUBE_TABLE} does not exist or is empty; run `python summary.py refresh`.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+GENDERS = ["Male", "Female", "Other"]
+REGIONS = ["Asia", "Africa", "Europe", "North America", "South America", "Oceania"]
+EDUCATION_LEVELS = ["High School", "Bachelor", "Master", "PhD"]
+INCOME_LEVELS = ["Low", "Lower-Mid", "Upper-Mid", "High"]
+DEVICE_TYPES = ["Smartphone", "Laptop", "Tablet", "Desktop"]
+
+# Rows generated (and written to SQLite) per chunk
+CHUNK_ROWS = 500_000
+
+
+def _clip_round(values, low, high, decimals=1):
+    return np.round(np.clip(values, low, high), decimals)
+
+
+def generate_frame(n_rows, seed=0, start=0):
+    """
+    Joined dataset with the same columns as config.load_data_from_postgres(),
+    plus user_id and date. Scores are correlated the way the dashboard expects:
+    more device hours -> more stress, less sleep -> more anxiety, and so on.
+    """
+    rng = np.random.default_rng([seed, start])
+    n = n_rows
+
+    gender = rng.choice(len(GENDERS), n, p=[0.48, 0.48, 0.04])
+    region = rng.choice(len(REGIONS), n)
+    education = rng.choice(len(EDUCATION_LEVELS), n, p=[0.3, 0.4, 0.22, 0.08])
+    income = np.clip(education + rng.integers(-1, 2, n), 0, len(INCOME_LEVELS) - 1)
+    device = rng.choice(len(DEVICE_TYPES), n, p=[0.5, 0.25, 0.1, 0.15])
+
+    device_hours = _clip_round(rng.gamma(4.0, 1.4, n) + 0.5 * (device == 0), 0, 16)
+    phone_unlocks = np.clip(rng.poisson(15 + 6 * device_hours), 0, 300)
+    sleep = _clip_round(8.2 - 0.18 * device_hours + rng.normal(0, 0.9, n), 3, 11)
+    stress = np.clip(np.round(2 + 0.45 * device_hours + rng.normal(0, 1.5, n)), 1, 10)
+    anxiety = np.clip(np.round(22 - 2.2 * sleep + 0.6 * stress - 0.8 * income + rng.normal(0, 3, n)), 0, 21)
+    happiness = _clip_round(9 - 0.45 * stress + 0.2 * income + rng.normal(0, 1, n), 1, 10)
+    focus = _clip_round(85 - 0.25 * phone_unlocks - 2 * stress + rng.normal(0, 8, n), 0, 100)
+    dependence = _clip_round(10 + 5.5 * device_hours + 0.1 * phone_unlocks + rng.normal(0, 8, n), 0, 100)
+    productivity = _clip_round(75 - 2.5 * stress + 3 * (device == 1) + rng.normal(0, 10, n), 0, 100)
+
+    dates = np.datetime64("2024-01-01") + rng.integers(0, 365, n).astype("timedelta64[D]")
+
+    def labels(values, choices):
+        return np.asarray(choices, dtype=object)[values]
+
+    return pd.DataFrame({
+        "user_id": np.arange(start, start + n, dtype=np.int64),
+        "date": dates,
+        "stress_level": stress,
+        "anxiety_score": anxiety,
+        "happiness_score": happiness,
+        "sleep_duration": sleep,
+        "focus_score": focus,
+        "gender": labels(gender, GENDERS),
+        "education_level": labels(education, EDUCATION_LEVELS),
+        "income_level": labels(income, INCOME_LEVELS),
+        "region": labels(region, REGIONS),
+        "digital_dependence_score": dependence,
+        "productivity_score": productivity,
+        "device_hours_per_day": device_hours,
+        "phone_unlocks": phone_unlocks,
+        "device_type": labels(device, DEVICE_TYPES),
+    })
+
+
+def split_tables(df):
+    """Split a joined frame into the six source tables (one user, assessment and log per row)"""
+    regions = pd.DataFrame({"region_id": range(len(REGIONS)), "region_name": REGIONS})
+    devices = pd.DataFrame({"device_id": range(len(DEVICE_TYPES)), "device_type": DEVICE_TYPES})
+    ids = df["user_id"].to_numpy()
+    date = df["date"].dt.strftime("%Y-%m-%d")
+    return {
+        "regions": regions,
+        "devices": devices,
+        "users": pd.DataFrame({
+            "user_id": ids,
+            "gender": df["gender"],
+            "education_level": df["education_level"],
+            "income_level": df["income_level"],
+            "region_id": pd.Categorical(df["region"], categories=REGIONS).codes,
+        }),
+        "wellness_assessments": pd.DataFrame({
+            "assessment_id": ids,
+            "user_id": ids,
+            "date": date,
+            "stress_level": df["stress_level"],
+            "anxiety_score": df["anxiety_score"],
+            "happiness_score": df["happiness_score"],
+            "sleep_duration": df["sleep_duration"],
+            "focus_score": df["focus_score"],
+        }),
+        "digital_lifestyle_scores": pd.DataFrame({
+            "assessment_id": ids,
+            "digital_dependence_score": df["digital_dependence_score"],
+            "productivity_score": df["productivity_score"],
+        }),
+        "activity_logs": pd.DataFrame({
+            "log_id": ids,
+            "user_id": ids,
+            "date": date,
+            "device_id": pd.Categorical(df["device_type"], categories=DEVICE_TYPES).codes,
+            "hours_used": df["device_hours_per_day"],
+            "phone_unlocks": df["phone_unlocks"],
+        }),
+    }
+
+
+def write_sqlite(path, n_rows, seed=0):
+    """
+    Write the six tables for `n_rows` synthetic rows into a SQLite file, chunk
+    by chunk, with the indexes the join in config.JOIN_SQL needs.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        for start in range(0, n_rows, CHUNK_ROWS):
+            chunk = generate_frame(min(CHUNK_ROWS, n_rows - start), seed=seed, start=start)
+            for name, table in split_tables(chunk).items():
+                if name in ("regions", "devices") and start > 0:
+                    continue
+                table.to_sql(name, conn, if_exists="replace" if start == 0 else "append", index=False)
+        conn.executescript("""
+            CREATE INDEX IF NOT EXISTS ix_wa_user ON wellness_assessments (user_id, date);
+            CREATE INDEX IF NOT EXISTS ix_dls_assessment ON digital_lifestyle_scores (assessment_id);
+            CREATE INDEX IF NOT EXISTS ix_al_user ON activity_logs (user_id, date);
+        """)
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,103 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Where p50/p95 per stage are written ("" disables the file)
+PERF_METRICS_PATH = os.getenv("PERF_METRICS_PATH", os.path.join(".cache", "perf_metrics.json"))
+# Minimum seconds between two writes of the metrics file
+PERF_METRICS_INTERVAL = float(os.getenv("PERF_METRICS_INTERVAL", "30"))
+# Print every span as a JSON line when set to "1"
+PERF_LOG = os.getenv("PERF_LOG", "0") == "1"
+
+# Spans of the current script run (a list), if a trace was started in this context
+_trace = contextvars.ContextVar("perf_trace", default=None)
+
+
+class StageTimings:
+    """
+    Process-wide recent durations per stage (bounded), with p50/p95 summaries
+    that are periodically written to a JSON metrics file.
+    """
+
+    def __init__(self, max_samples=1024, path=PERF_METRICS_PATH, interval=PERF_METRICS_INTERVAL):
+        self.max_samples = max_samples
+        self.path = path
+        self.interval = interval
+        self._samples = {}
+        self._counts = {}
+        self._last_write = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            due = self.path and time.monotonic() - self._last_write >= self.interval
+            if due:
+                self._last_write = time.monotonic()
+        if due:
+            self.write()
+
+    def summary(self):
+        """{stage: {"count", "p50_ms", "p95_ms", "max_ms"}} over the recent samples"""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for stage, values in sorted(samples.items()):
+            p50, p95 = np.percentile(values, [50, 95]) * 1000
+            summary[stage] = {
+                "count": counts[stage],
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "max_ms": round(float(values.max()) * 1000, 3),
+            }
+        return summary
+
+    def write(self, path=None):
+        """Write the summary to the metrics file (written to a temp file, then renamed)"""
+        path = path or self.path
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": time.time(), "stages": self.summary()}, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write performance metrics: {e}")
+
+
+TIMINGS = StageTimings()
+
+
+def start_trace():
+    """Start collecting the spans of the current script run; returns the (live) list of spans"""
+    trace = []
+    _trace.set(trace)
+    return trace
+
+
+@contextmanager
+def span(stage, **fields):
+    """Time a block as `stage`; extra `fields` are only used in the JSON log line"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        TIMINGS.record(stage, seconds)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((stage, seconds))
+        if PERF_LOG:
+            record = {"ts": round(time.time(), 3), "event": "span", "stage": stage, "ms": round(seconds * 1000, 3)}
+            print(json.dumps({**record, **fields}, default=str))
@@ -0,0 +1,212 @@
+"""
+Metrics over time per segment for the Trends page.
+
+DailyAggregates keeps running sums (sum and count per metric, accumulated
+over the days) for every gender x region segment. The mean over any run of
+days is the difference of two running sums, so daily / weekly points and
+rolling windows of any length cost O(points) and never rescan the rows.
+New rows are merged by adding their running sums from their first day on.
+Series are downsampled with LTTB before they are plotted.
+"""
+import numpy as np
+import pandas as pd
+
+TREND_METRICS = ["stress_level", "anxiety_score", "happiness_score", "device_hours_per_day"]
+SEGMENT_DIMENSIONS = ["gender", "region"]
+
+# Days per point of each resolution
+RESOLUTIONS = {"Daily": 1, "Weekly": 7}
+# Rolling window choices, in points of the resolution (1 = no smoothing)
+ROLLING_WINDOWS = {"Daily": [1, 7, 30, 90], "Weekly": [1, 4, 12]}
+# Points per series sent to the browser
+MAX_POINTS = 1000
+
+
+class DailyAggregates:
+    """
+    Running sum / count per segment and day of the trend metrics.
+    `cumulative` has shape (segments, days + 1, metrics, 2); row d holds the
+    totals of the days before day d, so row 0 is all zeros.
+    """
+
+    def __init__(self, start, cumulative, segments, metrics=TREND_METRICS):
+        self.start = pd.Timestamp(start)
+        self.cumulative = cumulative
+        self.segments = segments  # MultiIndex of (gender, region)
+        self.metrics = list(metrics)
+
+    @property
+    def days(self):
+        return self.cumulative.shape[1] - 1
+
+    @property
+    def end(self):
+        return self.start + pd.Timedelta(days=self.days - 1)
+
+    @classmethod
+    def from_sums(cls, table, metrics=TREND_METRICS):
+        """
+        Build from a table with one row per date and segment holding
+        <metric>_sum and <metric>_count columns (None when it is empty).
+        """
+        table = table.dropna(subset=["date", *SEGMENT_DIMENSIONS])
+        if table.empty:
+            return None
+        dates = pd.to_datetime(table["date"]).dt.normalize()
+        start = dates.min()
+        days = int((dates.max() - start).days) + 1
+        day = (dates - start).dt.days.to_numpy()
+        segment, segments = pd.MultiIndex.from_frame(table[SEGMENT_DIMENSIONS].astype(object)).factorize()
+        segments = segments.set_names(SEGMENT_DIMENSIONS)
+
+        daily = np.zeros((len(segments), days, len(metrics), 2))
+        for i, metric in enumerate(metrics):
+            np.add.at(daily[:, :, i, 0], (segment, day), table[f"{metric}_sum"].to_numpy("float64"))
+            np.add.at(daily[:, :, i, 1], (segment, day), table[f"{metric}_count"].to_numpy("float64"))
+        cumulative = np.zeros((len(segments), days + 1, len(metrics), 2))
+        np.cumsum(daily, axis=1, out=cumulative[:, 1:])
+        return cls(start, cumulative, segments, metrics)
+
+    @classmethod
+    def from_frame(cls, df, metrics=TREND_METRICS):
+        """Aggregate row-level data with a date column (None without dates)"""
+        if df is None or "date" not in df.columns or df.empty:
+            return None
+        metrics = [m for m in metrics if m in df.columns]
+        keys = [df[name] for name in ["date", *SEGMENT_DIMENSIONS]]
+        # Sum in float64: float32 sums over many rows lose precision
+        grouped = df[metrics].astype("float64").groupby(keys, observed=True).agg(["sum", "count"])
+        grouped.columns = [f"{metric}_{part}" for metric, part in grouped.columns]
+        return cls.from_sums(grouped.reset_index(), metrics)
+
+    def _aligned(self, segments, start, days):
+        """Running sums laid out on a (possibly larger) segment list and day range"""
+        out = np.zeros((len(segments), days + 1, len(self.metrics), 2))
+        rows = segments.get_indexer(self.segments)
+        offset = (self.start - start).days
+        stop = offset + self.days + 1
+        out[rows, offset:stop] = self.cumulative
+        out[rows, stop:] = self.cumulative[:, -1:]  # nothing was added after our last day
+        return out
+
+    def merge(self, other):
+        """
+        Add the aggregates of newer rows. The running sums only change from the
+        first day of `other` on; earlier days are copied as they are.
+        """
+        if other is None:
+            return self
+        segments = self.segments.append(other.segments).unique().set_names(SEGMENT_DIMENSIONS)
+        start = min(self.start, other.start)
+        days = int((max(self.end, other.end) - start).days) + 1
+        cumulative = self._aligned(segments, start, days)
+        first = (other.start - start).days + 1
+        cumulative[:, first:] += other._aligned(segments, start, days)[:, first:]
+        return DailyAggregates(start, cumulative, segments, self.metrics)
+
+    def before(self, day):
+        """Aggregates of the days before `day` only (None when there are none)"""
+        days = int((pd.Timestamp(day) - self.start).days)
+        if days <= 0:
+            return None
+        cumulative = self.cumulative[:, :min(days, self.days) + 1]
+        return DailyAggregates(self.start, cumulative, self.segments, self.metrics)
+
+    def filter(self, **selections):
+        """Aggregates of the segments matching the selections ("All" / None mean no filter)"""
+        selected = self._selected(selections)
+        return DailyAggregates(self.start, self.cumulative[selected], self.segments[selected], self.metrics)
+
+    def _selected(self, selections):
+        selected = np.ones(len(self.segments), dtype=bool)
+        for name, value in selections.items():
+            if value not in (None, "All"):
+                selected &= self.segments.get_level_values(name) == value
+        return selected
+
+    def series(self, metric, resolution="Daily", window=1, split_by=None, **filters):
+        """
+        Mean of `metric` per period, one column per value of `split_by` (or a
+        single "All" column), indexed by the last day of each period. Each point
+        averages the `window` periods ending there. Weekly periods end on Sundays.
+        """
+        if metric not in self.metrics:
+            raise ValueError(f"Unknown trend metric: {metric}")
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if split_by is not None and split_by not in SEGMENT_DIMENSIONS:
+            raise ValueError(f"Cannot split trends by {split_by}")
+
+        selected = self._selected(filters)
+        dates = pd.date_range(self.start, periods=self.days, freq="D", name="date")
+        ends = np.arange(self.days)
+        if RESOLUTIONS[resolution] > 1:
+            ends = np.flatnonzero(dates.dayofweek == 6)
+            if not len(ends) or ends[-1] != self.days - 1:
+                ends = np.append(ends, self.days - 1)  # current, partial week
+        # Point i covers the days after the end of period i - window up to the end of period i
+        upper = ends + 1
+        boundaries = np.concatenate([[0], upper])
+        lower = boundaries[np.maximum(np.arange(len(upper)) - max(int(window), 1) + 1, 0)]
+
+        if split_by is None:
+            groups = [("All", selected)]
+        else:
+            labels = self.segments.get_level_values(split_by)
+            groups = [(label, selected & (labels == label)) for label in sorted(set(labels[selected]))]
+
+        m = self.metrics.index(metric)
+        columns = {}
+        for label, rows in groups:
+            running = self.cumulative[rows, :, m].sum(axis=0)
+            totals = running[upper] - running[lower]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                columns[label] = np.where(totals[:, 1] > 0, totals[:, 0] / totals[:, 1], np.nan)
+        return pd.DataFrame(columns, index=dates[ends])
+
+
+def lttb(x, y, threshold):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets
+    downsampling: first and last point, plus per bucket the point forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(frame, max_points=MAX_POINTS):
+    """Reduce every column to at most `max_points` points with LTTB (missing values dropped)"""
+    columns = {}
+    for name in frame.columns:
+        series = frame[name].dropna()
+        x = series.index.asi8.astype("float64") if isinstance(series.index, pd.DatetimeIndex) \
+            else series.index.to_numpy("float64")
+        columns[name] = series.iloc[lttb(x, series.to_numpy("float64"), max_points)]
+    result = pd.DataFrame(columns, columns=frame.columns)
+    result.index.name = frame.index.name
+    return result
+
+
+def trend_frame(source, metric, resolution="Daily", window=1, split_by=None, max_points=MAX_POINTS):
+    """
+    Downsampled trend series of `metric`. `source` can be DailyAggregates or
+    an object with a trend() method (analytics engine or service source).
+    """
+    if isinstance(source, DailyAggregates):
+        return downsample(source.series(metric, resolution, window, split_by), max_points)
+    return source.trend(metric, resolution, window, split_by)